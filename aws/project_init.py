@@ -565,6 +565,81 @@ def create_sessions_table():
             raise exc
 
 
+def create_revoked_tokens_table():
+    """Create the 'RevokedTokens' DynamoDB table"""
+
+    # Create the DynamoDB table.
+    try:
+        table = DYNAMODB.create_table(
+            TableName='RevokedTokens',
+            KeySchema=[
+                {
+                    'AttributeName': 'uuid',
+                    'KeyType': 'HASH',
+                },
+            ],
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'uuid',
+                    'AttributeType': 'S',
+                },
+            ],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 1,
+                'WriteCapacityUnits': 1,
+            }
+        )
+        return table
+    except botocore.exceptions.ClientError as exc:
+        if 'ResourceInUseException' not in exc.__str__():
+            raise exc
+
+
+def create_cache_versions_table():
+    """Create the 'CacheVersions' DynamoDB table"""
+
+    # Create the DynamoDB table.
+    try:
+        table = DYNAMODB.create_table(
+            TableName='CacheVersions',
+            KeySchema=[
+                {
+                    'AttributeName': 'uuid',
+                    'KeyType': 'HASH',
+                },
+            ],
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'uuid',
+                    'AttributeType': 'S',
+                },
+            ],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 1,
+                'WriteCapacityUnits': 1,
+            }
+        )
+        return table
+    except botocore.exceptions.ClientError as exc:
+        if 'ResourceInUseException' not in exc.__str__():
+            raise exc
+
+
+def enable_time_to_live(table_name, attribute_name):
+    """Have DynamoDB delete records once the attribute's epoch time passes"""
+    try:
+        DYNAMODB.meta.client.update_time_to_live(
+            TableName=table_name,
+            TimeToLiveSpecification={
+                'Enabled': True,
+                'AttributeName': attribute_name,
+            }
+        )
+    except botocore.exceptions.ClientError as exc:
+        if 'already enabled' not in exc.__str__():
+            raise exc
+
+
 def wait(tables):
     """Wait for AWS to finish the table creation process"""
     for table_name, table in tables.items():
@@ -585,7 +660,10 @@ def main():
     tables['Applications'] = create_applications_table()
     tables['RecordLogs'] = create_record_logs_table()
     tables['Sessions'] = create_sessions_table()
+    tables['RevokedTokens'] = create_revoked_tokens_table()
+    tables['CacheVersions'] = create_cache_versions_table()
     wait(tables)
+    enable_time_to_live('RevokedTokens', 'expires')
 
     # API Gateway
 
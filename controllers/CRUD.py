@@ -1,6 +1,7 @@
 # pylint: disable=import-error
 """Basic CRUD Controller"""
 import Security
+from models import Base
 
 from . import ClientErrorException
 from .Security import require_role
@@ -66,3 +67,22 @@ class Controller(object):
             list of dicts
         """
         return self.factory.get_persister().query(search_data)
+
+    @require_role([Security.ROLE_COUNCIL_ADMIN, Security.ROLE_UNIT_ADMIN, Security.ROLE_GUARDIAN])
+    def search_page(self, search_data, page_size=None, cursor=None):
+        """Find, one page at a time
+
+        Args:
+            search_data: dict containing data to search for
+            page_size: maximum number of records to return
+            cursor: cursor returned with the previous page, if any
+        Returns:
+            dict: 'items': list of dicts, 'cursor': cursor for the next page
+                (None if there are no more records)
+        """
+        (items, next_cursor) = self.factory.get_persister().query_page(
+            search_data,
+            page_size or Base.QUERY_PAGE_SIZE,
+            cursor,
+        )
+        return {'items': items, 'cursor': next_cursor}
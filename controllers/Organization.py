@@ -1,6 +1,7 @@
 # pylint: disable=import-error
 """Organization Controller"""
 import Security
+from models import Base
 from models import District
 from models import Organization
 from models import RecordNotFoundException
@@ -107,6 +108,24 @@ class Controller(object):
         """
         return self.organization_persister.query(search_data)
 
+    def search_page(self, search_data, page_size=None, cursor=None):
+        """Find, one page at a time
+
+        Args:
+            search_data: dict containing data to search for
+            page_size: maximum number of records to return
+            cursor: cursor returned with the previous page, if any
+        Returns:
+            dict: 'items': list of Organization dicts, 'cursor': cursor for
+                the next page (None if there are no more records)
+        """
+        (items, next_cursor) = self.organization_persister.query_page(
+            search_data,
+            page_size or Base.QUERY_PAGE_SIZE,
+            cursor,
+        )
+        return {'items': items, 'cursor': next_cursor}
+
     def _get_factory_by_type(self, org_type):
         """Determines which model factory to use
 
@@ -1,15 +1,41 @@
 # pylint: disable=import-error
 """Organization Import Controller"""
 
+import bz2
+import collections
 import csv
-import StringIO
-
+import hashlib
+import json
+import time
+import zlib
+
+from models import COUNCIL_ID
+from models import InvalidObjectException
+from models import MultipleMatchException
+from models import Base
 from models import District
+from models import Organization
 from models import SponsoringOrganization
 from models import Subdistrict
 
 from . import ClientErrorException
 
+# Bytes read from S3 at a time
+S3_CHUNK_SIZE = 64 * 1024
+
+# Organization types described by the council's file
+IMPORTED_TYPES = [
+    Organization.ORG_TYPE_DISTRICT,
+    Organization.ORG_TYPE_SUBDISTRICT,
+    Organization.ORG_TYPE_SPONSORING_ORGANIZATION,
+]
+
+# Records validated together by filter_valid_records()
+VALIDATION_BATCH_SIZE = 500
+
+# Fields compared to decide whether an imported organization has changed
+FINGERPRINT_FIELDS = ['uuid', 'type', 'number', 'name', 'parent_uuid']
+
 
 class Controller(object):
     """Organization Import Controller
@@ -25,7 +51,8 @@ class Controller(object):
     def __init__(self,
                  district_factory=None,
                  subdistrict_factory=None,
-                 sporg_factory=None):
+                 sporg_factory=None,
+                 session=None):
         if district_factory:
             self.district_factory = district_factory
         else:
@@ -41,17 +68,31 @@ class Controller(object):
         else:
             self.sporg_factory = SponsoringOrganization.Factory()
 
+        if session:
+            self.session = session
+        else:
+            self.session = ImportSession()
+
+        # Rows of the last file processed that were missing a required column
+        self.skipped_rows = 0
+
+        # Record index => errors, for the records filter_valid_records()
+        # dropped
+        self.rejected_records = {}
+
     def process_s3_object(self, s3_object):
         """Process the data as it comes in from S3
 
+        The body is streamed a chunk at a time, so records are yielded
+        before the download finishes and memory use doesn't grow with the
+        file size.  Gzip and bzip2 files are decompressed transparently.
+
         Args:
             s3_object: boto3 s3_object object
         Yields:
-            tuple: of district, subdistrict, and sporg
+            dict
         """
-        data = s3_object['Body'].read()
-        data_file = StringIO.StringIO(data)
-        for record in self._process_file(data_file):
+        for record in self._process_file(iter_lines(s3_object['Body'])):
             yield record
 
     def process_file(self, filename):
@@ -91,11 +132,13 @@ class Controller(object):
         reader = csv.DictReader(data_file, dialect=csv.excel_tab)
         self._validate_headers(reader)
 
+        self.skipped_rows = 0
         row_num = 1
         for row in reader:
             row_num = row_num + 1
 
             if not self._is_valid_record(row):
+                self.skipped_rows = self.skipped_rows + 1
                 continue
 
             record = {
@@ -135,6 +178,170 @@ class Controller(object):
                 break
         return valid
 
+    def validate_records(self, records):
+        """Check organization file records before anything is written
+
+        The district, subdistrict, and sponsoring organization each record
+        describes are validated in batches, without loading anything from
+        the DB.
+
+        Args:
+            records: list of dicts, as yielded by process_file()
+        Returns:
+            dict of record index => list of error messages, for the records
+            that aren't valid
+        """
+        districts = []
+        subdistricts = []
+        sporgs = []
+        for record in records:
+            (district, subdistrict, sporg) = self._get_organization_data(record)
+            districts.append(district)
+            subdistricts.append(subdistrict)
+            sporgs.append(sporg)
+
+        errors = {}
+        for (factory, rows) in [
+                (self.district_factory, districts),
+                (self.subdistrict_factory, subdistricts),
+                (self.sporg_factory, sporgs)]:
+            for index, row_errors in Base.BatchValidator(factory).validate(rows).items():
+                errors.setdefault(index, []).extend(row_errors)
+        return errors
+
+    def filter_valid_records(self, records, batch_size=VALIDATION_BATCH_SIZE):
+        """Drop the records validate_records() rejects
+
+        Records are validated in batches as they stream past.  The errors
+        for each rejected record are kept in `rejected_records`, by its
+        position in `records`.
+
+        Args:
+            records: iterable of dicts, as yielded by process_file()
+            batch_size: records validated together
+        Yields:
+            dict: the valid records
+        """
+        self.rejected_records = {}
+        batch = []
+        offset = 0
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                for valid in self._filter_valid_batch(batch, offset):
+                    yield valid
+                offset = offset + len(batch)
+                batch = []
+        for valid in self._filter_valid_batch(batch, offset):
+            yield valid
+
+    def _filter_valid_batch(self, batch, offset):
+        """The valid records of a batch, noting the errors of the others"""
+        if not batch:
+            return []
+        errors = self.validate_records(batch)
+        for (index, record_errors) in errors.items():
+            self.rejected_records[offset + index] = record_errors
+        return [record for (index, record) in enumerate(batch) if index not in errors]
+
+    def diff_records(self, records, diff):
+        """Filter out records that don't add anything
+
+        Nothing is loaded from the DB; each record's organizations are
+        compared with the snapshot in `diff`, which records the differences.
+        Only records with a new organization need processing; changes to
+        stored organizations are written from the diff (see
+        get_changed_organizations()).
+
+        Args:
+            records: iterable of dicts, as yielded by process_file()
+            diff: ImportDiff
+        Yields:
+            dict: the records with a new organization
+        """
+        factories = (self.district_factory, self.subdistrict_factory, self.sporg_factory)
+        for record in records:
+            (levels, uuids) = self._get_hierarchy(record)
+            orgs = []
+            for (factory, data, uuid) in zip(factories, levels, uuids):
+                org = factory.construct_compact(data, invalid_field_exceptions=False).to_dict()
+                org['uuid'] = uuid
+                orgs.append(org)
+            if diff.add(orgs):
+                yield record
+
+    def get_changed_organizations(self, diff):
+        """The stored organizations the import changes, parents first
+
+        Args:
+            diff: ImportDiff, after diff_records() has been run over the file
+        Returns:
+            list of partial objects holding just the changed fields, for
+            Persister.save() to write as field-level updates
+        """
+        factories = dict(zip(
+            IMPORTED_TYPES,
+            (self.district_factory, self.subdistrict_factory, self.sporg_factory),
+        ))
+        objs = []
+        for (uuid, changes) in diff.changes.items():
+            stored = diff.stored[uuid]
+            obj = factories[stored['type']].construct_partial({
+                'type': stored['type'],
+                'number': stored['number'],
+                'parent_uuid': stored['parent_uuid'],
+            })
+            for (key, val) in changes.items():
+                setattr(obj, key, val)
+            objs.append(obj)
+        objs.sort(key=lambda obj: IMPORTED_TYPES.index(obj.type))
+        return objs
+
+    def get_deleted_organizations(self, diff):
+        """The organizations the import no longer mentions, children first
+
+        Args:
+            diff: ImportDiff, after diff_records() has been run over the file
+        Returns:
+            list of partial objects, for Persister.delete_many()
+        """
+        factories = dict(zip(
+            IMPORTED_TYPES,
+            (self.district_factory, self.subdistrict_factory, self.sporg_factory),
+        ))
+        stored = [diff.stored[uuid] for uuid in diff.get_deletes()]
+        stored.sort(key=lambda fields: -IMPORTED_TYPES.index(fields['type']))
+        return [factories[fields['type']].construct_partial(fields) for fields in stored]
+
+    def _get_organization_data(self, record):
+        """The district, subdistrict, and sporg data a record describes"""
+        return self._get_hierarchy(record)[0]
+
+    def _get_hierarchy(self, record):
+        """The district, subdistrict, and sporg a record describes
+
+        Returns:
+            tuple: the (district, subdistrict, sporg) data, and their uuids
+                ('' for one that can't have a uuid)
+        """
+        levels = [
+            {
+                'number': record['{}_number'.format(column)].strip(),
+                'name': record['{}_name'.format(column)].strip(),
+            }
+            for column in ('district', 'subdistrict', 'sporg')
+        ]
+        uuids = Organization.precompute_uuids('cnl-' + COUNCIL_ID, [
+            (factory.get_uuid_prefix(), data['number'])
+            for (factory, data) in zip(
+                (self.district_factory, self.subdistrict_factory, self.sporg_factory),
+                levels,
+            )
+        ])
+        levels[1]['parent_uuid'] = uuids[0]
+        levels[2]['parent_uuid'] = uuids[1]
+        return (tuple(levels), uuids)
+
     def process_record(self, record):
         """Processes an organization file record as provided by the council
 
@@ -150,25 +357,59 @@ class Controller(object):
         sporg = self._process_sponsoring_organization(record, subdistrict)
         return (district, subdistrict, sporg)
 
+    def plan_records(self, records, plan=None):
+        """Process records into a plan for writing them
+
+        A record that can't be processed is noted in the plan's `rejected`
+        list rather than stopping the others.
+
+        Args:
+            records: list of dicts, as yielded by process_file()
+            plan: WritePlan to add to; a new one by default
+        Returns:
+            WritePlan
+        """
+        plan = plan if plan is not None else WritePlan()
+        for record in records:
+            try:
+                objs = self.process_record(record)
+            except (InvalidObjectException, MultipleMatchException) as exc:
+                plan.rejected.append((record, str(exc)))
+                continue
+            plan.add(*objs, record=record)
+        return plan
+
     def _process_district(self, data):
         """Process the data for a District
 
+        Each district is loaded and validated once per session.
+
         Args:
             data: dict from file data
         Returns:
             District object
         """
-        return self.district_factory.get_from_file_data(data)
+        key = (data['district_number'].strip(), data['district_name'].strip())
+        return self.session.get_district(
+            key,
+            lambda: self.district_factory.get_from_file_data(data),
+        )
 
     def _process_subdistrict(self, data, district):
         """Process the data for a Subdistrict
 
+        Each subdistrict is loaded and validated once per session.
+
         Args:
             data: dict from file data
         Returns:
             Subdistrict object
         """
-        return self.subdistrict_factory.get_from_file_data(data, district)
+        key = (data['subdistrict_number'].strip(), data['subdistrict_name'].strip(), district.uuid)
+        return self.session.get_subdistrict(
+            key,
+            lambda: self.subdistrict_factory.get_from_file_data(data, district),
+        )
 
     def _process_sponsoring_organization(self, data, subdistrict):  # pylint: disable=invalid-name
         """Process the data for a Sponsoring Organization
@@ -179,3 +420,301 @@ class Controller(object):
             sporg object
         """
         return self.sporg_factory.get_from_file_data(data, subdistrict)
+
+
+class WritePlan(object):
+    """The organizations an import writes, each once, parents first
+
+    Rows repeat their district and subdistrict, so the plan keeps one object
+    per uuid and writes the districts, then the subdistricts, then the
+    sponsoring organizations with batch writes.  Objects loaded from the DB
+    that haven't changed aren't written at all.
+
+    A level is only written once the level above it has been, so a
+    record's parent is always stored before the record is; only the
+    children of an organization that failed are held back.
+    """
+
+    def __init__(self):
+        self._levels = [collections.OrderedDict() for _ in range(3)]
+
+        # (record, error message) for the records that couldn't be planned
+        self.rejected = []
+
+        # (record, uuids of its organizations), for reporting per record
+        self._records = []
+
+    def __len__(self):
+        return sum([len(level) for level in self._levels])
+
+    def add(self, district, subdistrict, sporg, record=None):
+        """Add the organizations from a processed record
+
+        Args:
+            district, subdistrict, sporg: the record's organizations
+            record: the import record, if execute() should report on it
+        """
+        objs = (district, subdistrict, sporg)
+        for (level, obj) in zip(self._levels, objs):
+            level[obj.uuid] = obj
+        if record is not None:
+            self._records.append((record, [obj.uuid for obj in objs]))
+
+    def get_levels(self):
+        """Get the objects to write, one list per level, parents first"""
+        return [
+            [obj for obj in level.values() if obj.get_changes() != {}]
+            for level in self._levels
+        ]
+
+    def execute(self, persister):
+        """Write the plan
+
+        Args:
+            persister: Persister for the Organizations table
+        Returns:
+            dict: 'written': list of objects written,
+                'unchanged': number of objects skipped,
+                'failed': list of (object, error message) tuples, including
+                the children of objects that failed, which aren't tried,
+                'failed_records': list of (record, error message) tuples
+                for the records added with an organization that failed
+        """
+        levels = self.get_levels()
+        summary = {
+            'written': [],
+            'unchanged': len(self) - sum([len(objs) for objs in levels]),
+            'failed': [],
+        }
+        errors = {}
+        for objs in levels:
+            orphans = [obj for obj in objs if obj.parent_uuid in errors]
+            for obj in orphans:
+                errors[obj.uuid] = 'Parent {} not written'.format(obj.parent_uuid)
+                summary['failed'].append((obj, errors[obj.uuid]))
+            objs = [obj for obj in objs if obj.uuid not in errors]
+            if objs:
+                result = persister.save_many(objs)
+                summary['written'].extend(result['succeeded'])
+                summary['failed'].extend(result['failed'])
+                for (obj, error) in result['failed']:
+                    errors[obj.uuid] = error
+
+        summary['failed_records'] = []
+        for (record, uuids) in self._records:
+            record_errors = [errors[uuid] for uuid in uuids if uuid in errors]
+            if record_errors:
+                summary['failed_records'].append((record, record_errors[0]))
+        return summary
+
+
+class ImportDiff(object):
+    """Differences between an import file and the stored organizations
+
+    Each organization is reduced to a fingerprint of FINGERPRINT_FIELDS and
+    compared with a snapshot of the Organizations table, so that only new
+    organizations need to be processed, and changed ones only need their
+    changed fields written:
+
+        diff = ImportDiff.load(Organization.Persister())
+        for record in controller.diff_records(records, diff):
+            ...
+        for obj in controller.get_changed_organizations(diff):
+            persister.save(obj)
+        print(diff.get_summary())
+    """
+
+    def __init__(self, items):
+        """
+        Args:
+            items: stored organization records (dicts)
+        """
+        self.stored = {}
+        self.fingerprints = {}
+        for item in items:
+            fields = self._get_fields(item)
+            self.stored[item['uuid']] = fields
+            self.fingerprints[item['uuid']] = get_fingerprint(fields)
+        self.inserts = collections.OrderedDict()
+        self.changes = collections.OrderedDict()
+        self.unchanged = 0
+        self._seen = set()
+
+    @classmethod
+    def load(cls, persister, total_segments=Base.SCAN_SEGMENTS):
+        """Snapshot the table with a parallel scan"""
+        return cls(persister.scan(total_segments=total_segments))
+
+    def add(self, orgs):
+        """Compare a record's organizations with the snapshot
+
+        Organizations shared by several records are compared once.
+
+        Args:
+            orgs: dicts of organization fields, including uuid
+        Returns:
+            bool: whether any of them is new; records that can't be given a
+                uuid count as new, so they get processed (and rejected) as
+                usual
+        """
+        new = False
+        for org in orgs:
+            uuid = org['uuid']
+            if not uuid:
+                new = True
+                continue
+            if uuid in self._seen:
+                new = new or uuid in self.inserts
+                continue
+            self._seen.add(uuid)
+            fields = self._get_fields(org)
+            if uuid not in self.stored:
+                self.inserts[uuid] = fields
+                new = True
+            elif get_fingerprint(fields) != self.fingerprints[uuid]:
+                self.changes[uuid] = dict([
+                    (key, val) for (key, val) in fields.items() if self.stored[uuid].get(key) != val
+                ])
+            else:
+                self.unchanged = self.unchanged + 1
+        return new
+
+    def get_deletes(self, types=None):
+        """Stored organizations the import didn't mention
+
+        Organizations that still have other stored records under them (units,
+        for example) are kept.
+
+        Args:
+            types: organization types to consider; defaults to the types an
+                import file describes
+        Returns:
+            sorted list of uuids
+        """
+        types = types or IMPORTED_TYPES
+        deletes = set([
+            uuid for (uuid, fields) in self.stored.items()
+            if fields.get('type') in types and uuid not in self._seen
+        ])
+        while True:
+            kept_parents = set([
+                fields.get('parent_uuid') for (uuid, fields) in self.stored.items() if uuid not in deletes
+            ])
+            if not deletes & kept_parents:
+                return sorted(deletes)
+            deletes = deletes - kept_parents
+
+    def get_summary(self, include_deletes=False):
+        """Counts of the differences
+
+        Returns:
+            dict: inserts, changes, unchanged, and (if include_deletes)
+                deletes
+        """
+        summary = {
+            'inserts': len(self.inserts),
+            'changes': len(self.changes),
+            'unchanged': self.unchanged,
+        }
+        if include_deletes:
+            summary['deletes'] = len(self.get_deletes())
+        return summary
+
+    @staticmethod
+    def _get_fields(data):
+        return dict([(key, data.get(key) or '') for key in FINGERPRINT_FIELDS])
+
+
+def get_fingerprint(fields):
+    """Hash of an organization's FINGERPRINT_FIELDS"""
+    return hashlib.sha1(
+        json.dumps([fields.get(key) or '' for key in FINGERPRINT_FIELDS]).encode('utf-8')
+    ).hexdigest()
+
+
+class ImportSession(object):
+    """Districts and subdistricts resolved during an import
+
+    Thousands of rows share a handful of districts and subdistricts, so each
+    is looked up (and validated) once and the same object is handed to every
+    row that names it.  A session lasts for a file, or for a worker's warm
+    lifetime when max_age is given; callers start a new one when
+    is_expired() says so, which bounds how long changes made elsewhere can
+    go unseen.
+    """
+
+    def __init__(self, max_age=None):
+        """
+        Args:
+            max_age: seconds the session may be reused, or None for no limit
+        """
+        self.max_age = max_age
+        self.started = time.time()
+        self.hits = 0
+        self.misses = 0
+        self._districts = {}
+        self._subdistricts = {}
+
+    def is_expired(self):
+        """Whether the session is older than max_age"""
+        return self.max_age is not None and time.time() - self.started > self.max_age
+
+    def get_district(self, key, load):
+        """Get the district for the key, calling `load()` the first time"""
+        return self._get(self._districts, key, load)
+
+    def get_subdistrict(self, key, load):
+        """Get the subdistrict for the key, calling `load()` the first time"""
+        return self._get(self._subdistricts, key, load)
+
+    def _get(self, objs, key, load):
+        if key in objs:
+            self.hits = self.hits + 1
+        else:
+            self.misses = self.misses + 1
+            objs[key] = load()
+        return objs[key]
+
+
+def iter_lines(stream, chunk_size=S3_CHUNK_SIZE):
+    """Iterate over the lines of a (possibly compressed) stream
+
+    Args:
+        stream: file-like object with read(size), e.g. an S3 StreamingBody
+        chunk_size: bytes to read at a time
+    Yields:
+        str: each line, including its line ending
+    """
+    decompressor = None
+    pending = ''
+    first = True
+    while True:
+        chunk = stream.read(chunk_size)
+        if first:
+            decompressor = _get_decompressor(chunk)
+            first = False
+        if not chunk:
+            break
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+        lines = (pending + chunk).splitlines(True)
+        pending = ''
+        if lines and not lines[-1].endswith('\n'):
+            # incomplete, or a '\r' that may be followed by '\n'
+            pending = lines.pop()
+        for line in lines:
+            yield line
+    if hasattr(decompressor, 'flush'):
+        pending = pending + decompressor.flush()
+    if pending:
+        yield pending
+
+
+def _get_decompressor(chunk):
+    """Pick a decompressor based on the stream's first bytes"""
+    if chunk.startswith('\x1f\x8b'):
+        # gzip header
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif chunk.startswith('BZh'):
+        return bz2.BZ2Decompressor()
+    return None
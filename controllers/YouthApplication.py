@@ -53,7 +53,7 @@ class Controller(object):
         if youth_factory:
             self.youth_factory = youth_factory
         else:
-            youth_factory = Youth.YouthFactory()
+            self.youth_factory = Youth.YouthFactory()
 
     @require_role(Security.ROLE_COUNCIL_EMPLOYEE)
     def get_applications_by_status(self, status):
@@ -62,10 +62,11 @@ class Controller(object):
         Args:
             status: string containing the status to search for
         Returns:
-            List of Applications matching the specified status
+            List of Application dicts matching the specified status
         """
         results = self.persister.get_by_status(status)
-        return results
+        apps = self.factory.load_many_by_uuid([result['uuid'] for result in results])
+        return [app.to_dict() for app in apps]
 
     # No specific rights required to submit an application
     @require_status(Youth.APPLICATION_STATUS_CREATED)
@@ -303,7 +304,8 @@ class Controller(object):
                     required for non-new youth.
                 recorded_in_scoutnet_date (optional): defaults to current date
         Returns:
-            Application object (updated)
+            tuple: Application object (updated), and Youth object (new or
+                updated)
         """
         if 'date' not in data:
             data['date'] = date.today().isoformat()
@@ -320,7 +322,7 @@ class Controller(object):
 
         app.validate()
         youth.validate()
-        return app
+        return (app, youth)
 
     def _get_youth_scoutnet_id(self, app):
         """Get the ScoutNet ID on file
@@ -1,5 +1,18 @@
 """Default Lambda functions"""
+import os
+
+from models import Cache
 from models import Session
+from models import Token
+from models import User
+
+# session uuid => User, so a burst of requests from one user (a guardian
+# clicking through the approval flow) doesn't re-query Users each time.
+# Role changes and log outs elsewhere take up to the TTL to be seen.
+SESSION_USERS = Cache.LRUCache(
+    max_size=int(os.environ.get('SESSION_CACHE_SIZE', 500)),
+    ttl=int(os.environ.get('SESSION_CACHE_TTL', 30)),
+)
 
 
 def get_session(event):
@@ -12,3 +25,27 @@ def get_session(event):
     else:
         session = Session.Session()
     return session
+
+
+def get_user(event):
+    """Get the authenticated user from the event
+
+    A 'session_token' is verified locally, without reading DynamoDB; the
+    user it returns only has its uuid and roles.  Otherwise the user is
+    loaded by 'session_uuid', and cached briefly.
+    """
+    if 'session_token' in event:
+        return Token.get_user(event['session_token'])
+
+    session_uuid = event['session_uuid']
+    user = SESSION_USERS.get(session_uuid)
+    if user is None:
+        user = User.Factory().load_by_session(session_uuid)
+        SESSION_USERS.set(session_uuid, user)
+    return user
+
+
+def end_session(event):
+    """Forget the event's session in this process"""
+    if 'session_uuid' in event:
+        SESSION_USERS.invalidate(event['session_uuid'])
@@ -6,20 +6,61 @@ AWS Lambda needs nice, clean hooks.  This file provides those.
 from __future__ import print_function
 
 import json
+import os
+import time
 import urllib
+from multiprocessing.pool import ThreadPool
 
 import boto3
+import botocore.exceptions
 
 from controllers import Organization
 from controllers import OrganizationImport
+from lambda_base import get_user
+from models import Cache
 from models import Organization as OrganizationModel
-from models import District
-from models import SponsoringOrganization
-from models import Subdistrict
-from models import User
+from models import RecordNotFoundException
+from models import Throttle
 
 TOPIC_ARN = 'arn:aws:sns:us-west-2:480058411585:organization_update'
 SNS = boto3.client('sns')
+S3 = boto3.client('s3')
+
+# Import records packed into each organization_update message.  Records are
+# a couple hundred bytes, well under SNS's 256 KB message limit.
+RECORDS_PER_MESSAGE = 25
+
+# Times a record is tried before process_record gives up on it; records
+# that fail are queued again in a new message
+IMPORT_MAX_ATTEMPTS = int(os.environ.get('ORGANIZATION_IMPORT_MAX_ATTEMPTS', 3))
+
+# Messages published at once, each on its own thread
+MESSAGES_PER_BATCH = 10
+
+# SNS error codes that are worth retrying
+SNS_THROTTLING_ERROR_CODES = ['Throttling', 'ThrottledException']
+
+# Percentage of the Organizations table's capacity an import may use (unset
+# for no limit).  Each process_record container limits itself separately, so
+# the budget is split evenly over ORGANIZATION_IMPORT_CONCURRENCY workers;
+# set it to the function's reserved concurrency, or the workers together
+# will use more than the budget.
+IMPORT_CAPACITY_PERCENT = os.environ.get('ORGANIZATION_IMPORT_CAPACITY_PERCENT')
+IMPORT_CONCURRENCY = int(os.environ.get('ORGANIZATION_IMPORT_CONCURRENCY', 1))
+_import_limited = False
+
+# Only queue records whose organizations differ from what's stored ('0' to
+# queue every record), and optionally delete organizations the file no
+# longer lists ('1')
+IMPORT_DIFFERENTIAL = os.environ.get('ORGANIZATION_IMPORT_DIFFERENTIAL', '1') == '1'
+IMPORT_DELETE_MISSING = os.environ.get('ORGANIZATION_IMPORT_DELETE_MISSING', '0') == '1'
+
+# Rejected import records whose errors are included in the response
+MAX_REPORTED_REJECTIONS = 20
+
+# Seconds a warm worker reuses the districts and subdistricts it has resolved
+IMPORT_SESSION_SECONDS = int(os.environ.get('ORGANIZATION_IMPORT_SESSION_TTL', 300))
+_import_session = None
 
 
 def get(event, context):
@@ -30,8 +71,14 @@ def get(event, context):
 
 
 def search(event, context):
-    """Lambda facade for Organization.Controller.search method"""
+    """Lambda facade for Organization.Controller.search method
+
+    If 'page_size' or 'cursor' is provided, one page of results is returned
+    along with the cursor for the next page.
+    """
     controller = _get_controller(event, context)
+    if 'page_size' in event or 'cursor' in event:
+        return controller.search_page(event['search_data'], event.get('page_size'), event.get('cursor'))
     result = controller.search(event['search_data'])
     return result
 
@@ -53,63 +100,245 @@ def put(event, context):
 
 
 def import_data(event, context):
-    """Lambda facade for OrganizationImport.process_s3_object method"""
-    s3_service = boto3.client('s3')
+    """Lambda facade for OrganizationImport.process_s3_object method
 
+    Records that don't validate are dropped before anything is queued; the
+    response counts them and lists the errors of the first few.
+
+    With IMPORT_DIFFERENTIAL, the Organizations table is snapshotted first
+    and only records with new organizations are queued.  Changed
+    organizations are updated here, one field-level update each, and
+    organizations the file no longer lists are deleted if
+    IMPORT_DELETE_MISSING is set and every row of the file was usable.  The
+    response includes a summary of the differences.
+    """
     bucket = event['Records'][0]['s3']['bucket']['name']
     key = urllib.unquote_plus(event['Records'][0]['s3']['object']['key']).decode('utf8')
     try:
-        response = s3_service.get_object(Bucket=bucket, Key=key)
+        response = S3.get_object(Bucket=bucket, Key=key)
     except Exception as exc:
         print(exc)
         print('Error getting object {} from bucket {}.'.format(key, bucket))
         raise exc
 
     controller = _get_import_controller(event, context)
+    persister = OrganizationModel.Persister()
+    records = controller.filter_valid_records(controller.process_s3_object(response))
+    if IMPORT_DIFFERENTIAL:
+        diff = OrganizationImport.ImportDiff.load(persister)
+        records = controller.diff_records(records, diff)
 
     num_processed = 0
-
-    for record in controller.process_s3_object(response):
-        _queue_update(record)
-        num_processed = num_processed + 1
-        if 'test' in event['Records'][0] and num_processed >= 100:
-            break
+    num_messages = 0
+    messages = []
+    for message in _get_messages(records, event):
+        messages.append(message)
+        num_processed = num_processed + len(message)
+        if len(messages) >= MESSAGES_PER_BATCH:
+            _queue_updates(messages)
+            num_messages = num_messages + len(messages)
+            messages = []
+    if messages:
+        _queue_updates(messages)
+        num_messages = num_messages + len(messages)
 
     response = {
         'records_processed': num_processed,
+        'messages_published': num_messages,
+        'records_rejected': len(controller.rejected_records),
+        'rejections': dict([
+            (index, controller.rejected_records[index])
+            for index in sorted(controller.rejected_records)[:MAX_REPORTED_REJECTIONS]
+        ]),
     }
+    if IMPORT_DIFFERENTIAL:
+        response['diff'] = diff.get_summary(include_deletes=IMPORT_DELETE_MISSING)
+        response['skipped_rows'] = controller.skipped_rows
+        _limit_import()
+
+        # Every update and delete is announced to other caches at once
+        with OrganizationModel.deferred_invalidation():
+            # Changed organizations only have their changed fields written
+            failed = []
+            for obj in controller.get_changed_organizations(diff):
+                try:
+                    persister.save(obj)
+                except RecordNotFoundException:
+                    failed.append(obj)
+            response['updates_failed'] = len(failed)
+
+            # Skipped and rejected rows would look like deletions
+            if IMPORT_DELETE_MISSING and controller.skipped_rows:
+                response['deletes_refused'] = '{} rows were skipped'.format(controller.skipped_rows)
+            elif IMPORT_DELETE_MISSING and controller.rejected_records:
+                response['deletes_refused'] = '{} records were rejected'.format(len(controller.rejected_records))
+            elif IMPORT_DELETE_MISSING and 'test' not in event['Records'][0]:
+                result = persister.delete_many(controller.get_deleted_organizations(diff))
+                response['deletes_failed'] = len(result['failed'])
     print(response)
     return response
 
 
-def _queue_update(data):
-    SNS.publish(
-        TopicArn=TOPIC_ARN,
-        Subject='Organization update message',
-        Message=json.dumps(data),
-    )
+def _get_messages(records, event):
+    """Group records into lists of up to RECORDS_PER_MESSAGE"""
+    num_processed = 0
+    message = []
+    for record in records:
+        message.append(record)
+        num_processed = num_processed + 1
+        if len(message) >= RECORDS_PER_MESSAGE:
+            yield message
+            message = []
+        if 'test' in event['Records'][0] and num_processed >= 100:
+            break
+    if message:
+        yield message
+
+
+def _queue_updates(messages):
+    """Publish up to MESSAGES_PER_BATCH messages of import records at once
+
+    Args:
+        messages: list of lists of import records
+    """
+    pool = ThreadPool(min(len(messages), MESSAGES_PER_BATCH))
+    try:
+        pool.map(_queue_update, messages)
+    finally:
+        pool.close()
+
+
+def _queue_update(records, attempt=None):
+    """Publish a message of import records, retrying throttling with backoff
+
+    Args:
+        records: list of import records
+        attempt: the number of the attempt the message is for, if it's a
+            retry
+    """
+    message = {'records': records}
+    if attempt:
+        message['attempt'] = attempt
+    tries = 0
+    while True:
+        try:
+            SNS.publish(
+                TopicArn=TOPIC_ARN,
+                Subject='Organization update message',
+                Message=json.dumps(message),
+            )
+            return
+        except botocore.exceptions.ClientError as exc:
+            tries = tries + 1
+            if exc.response['Error']['Code'] not in SNS_THROTTLING_ERROR_CODES or tries >= Throttle.MAX_ATTEMPTS:
+                raise
+            time.sleep(Throttle.get_backoff_seconds(tries))
 
 
 def process_record(event, context):
-    """Lambda facade for Organization.Controller.process_record method"""
+    """Lambda facade for Organization.Controller.process_record method
+
+    Every record in the event is processed.  Messages carry a list of import
+    records ({'records': [...]}); messages holding a single record, as
+    published before records were batched, are still accepted.
+
+    Records that can't be processed (because they don't validate, say) are
+    printed and dropped; the rest are still written.  Records whose
+    organizations fail to be written are queued again on their own, up to
+    IMPORT_MAX_ATTEMPTS times; nothing is raised, since that would have SNS
+    retry the records that were written too.
+
+    The message's writes are announced to other containers' caches with a
+    single bump of the organization cache's version stamp.
+    """
+    records = []
+    attempts = {}
+    for sns_record in event['Records']:
+        data = json.loads(sns_record['Sns']['Message'])
+        if 'invalidate' in data:
+            # Published to organization_update by earlier versions
+            continue
+        for record in data['records'] if 'records' in data else [data]:
+            records.append(record)
+            attempts[id(record)] = data.get('attempt', 1)
+    if not records:
+        return ''
+
+    _limit_import(IMPORT_CONCURRENCY)
     controller = _get_import_controller(event, context)
-    message = event['Records'][0]['Sns']['Message']
-    data = json.loads(message)
 
-    (district, subdistrict, sporg) = controller.process_record(data)
+    # Each organization is written once, parents first, with batch writes
+    plan = controller.plan_records(records)
+    for (record, error) in plan.rejected:
+        print('Rejected organization record {}: {}'.format(json.dumps(record), error))
+    with OrganizationModel.deferred_invalidation():
+        summary = plan.execute(OrganizationModel.Persister())
 
-    District.Persister().save(district)
-    Subdistrict.Persister().save(subdistrict)
-    SponsoringOrganization.Persister().save(sporg)
-    return ''
+    # The writes are idempotent, so failed records are simply tried again
+    retries = {}
+    for (record, error) in summary['failed_records']:
+        print('Unable to write organization record {}: {}'.format(json.dumps(record), error))
+        if attempts[id(record)] < IMPORT_MAX_ATTEMPTS:
+            retries.setdefault(attempts[id(record)] + 1, []).append(record)
+    for (attempt, retry_records) in sorted(retries.items()):
+        for start in range(0, len(retry_records), RECORDS_PER_MESSAGE):
+            _queue_update(retry_records[start:start + RECORDS_PER_MESSAGE], attempt)
+
+    return {
+        'written': len(summary['written']),
+        'rejected': len(plan.rejected),
+        'failed': len(summary['failed_records']),
+        'requeued': sum([len(retry_records) for retry_records in retries.values()]),
+    }
+
+
+def invalidate_cache(event, context):
+    """Lambda facade dropping cached organizations named on organization_invalidation
+
+    For organizations changed outside this API (by tools or by hand).  The
+    uuids are dropped here and announced with the cache's version stamp, so
+    every container serving reads drops them within a version check.
+    """
+    uuids = []
+    for record in event['Records']:
+        data = json.loads(record['Sns']['Message'])
+        uuids.extend(data.get('invalidate', []))
+    if uuids:
+        Cache.publish(OrganizationModel.CACHE_CHANNEL, uuids)
+        OrganizationModel.announce_changes(uuids)
+    return {'invalidated': len(uuids)}
+
+
+def _limit_import(workers=1):
+    """Hold this container to its share of the import's capacity budget, once
+
+    Args:
+        workers: containers that may be importing at once
+    """
+    global _import_limited  # pylint: disable=global-statement
+    if IMPORT_CAPACITY_PERCENT and not _import_limited:
+        Throttle.limit_table(
+            OrganizationModel.Persister._get_table_name(),  # pylint: disable=protected-access
+            float(IMPORT_CAPACITY_PERCENT),
+            workers=workers,
+        )
+        _import_limited = True
 
 
 def _get_controller(event, context):
     """Creates and returns the Controller object"""
-    user = User.Factory().load_by_session(event['session_uuid'])
+    user = get_user(event)
     return Organization.Controller(user)
 
 
 def _get_import_controller(event, context):
-    """Creates and returns the Controller object"""
-    return OrganizationImport.Controller()
+    """Creates and returns the Controller object
+
+    The import session is kept for the life of the container (up to
+    IMPORT_SESSION_SECONDS), so districts and subdistricts are resolved once
+    per worker rather than once per message.
+    """
+    global _import_session  # pylint: disable=global-statement
+    if _import_session is None or _import_session.is_expired():
+        _import_session = OrganizationImport.ImportSession(IMPORT_SESSION_SECONDS)
+    return OrganizationImport.Controller(session=_import_session)
@@ -6,30 +6,49 @@ AWS Lambda needs nice, clean hooks.  This file provides those.
 from __future__ import print_function
 
 from controllers import User
+from lambda_base import end_session
 from lambda_base import get_session
-from models import User as UserModel
+from lambda_base import get_user
 from models import Session
+from models import Token
 
 
 def log_in(event, context):
-    """Log the user in"""
+    """Log the user in
+
+    When token sessions are enabled, the response includes a signed
+    'session_token' to send with later requests instead of a session uuid.
+    """
     controller = User.Controller(None)
 
     user = controller.log_in(event['username'], event['password'])
 
-    session = get_session(event)
-    session.set('user_uuid', user.uuid)
-    Session.Persister().save(session)
-
     response = {
         'uuid': user.uuid,
         'first_name': user.first_name,
         'last_name': user.last_name,
     }
+
+    if Token.is_enabled():
+        response['session_token'] = Token.issue(user)
+    else:
+        session = get_session(event)
+        session.set('user_uuid', user.uuid)
+        Session.Persister().save(session)
     return response
 
 
+def log_out(event, context):
+    """Log the user out, revoking their session token or ending their session"""
+    if 'session_token' in event:
+        Token.revoke(event['session_token'])
+    elif 'session_uuid' in event:
+        Session.Persister().delete(get_session(event))
+        end_session(event)
+    return ''
+
+
 def _get_controller(event, context):
     """Creates and returns the Controller object"""
-    user = UserModel.Factory().load_by_session(event['session_uuid'])
+    user = get_user(event)
     return User.Controller(user)
@@ -6,8 +6,8 @@ AWS Lambda needs nice, clean hooks.  This file provides those.
 from __future__ import print_function
 
 from controllers import Volunteer
+from lambda_base import get_user
 from models import Volunteer as VolunteerModel
-from models import User
 
 
 def get(event, context):
@@ -18,8 +18,14 @@ def get(event, context):
 
 
 def search(event, context):
-    """Lambda facade for Volunteer.Controller.search method"""
+    """Lambda facade for Volunteer.Controller.search method
+
+    If 'page_size' or 'cursor' is provided, one page of results is returned
+    along with the cursor for the next page.
+    """
     controller = _get_controller(event, context)
+    if 'page_size' in event or 'cursor' in event:
+        return controller.search_page(event['search_data'], event.get('page_size'), event.get('cursor'))
     result = controller.search(event['search_data'])
     return result
 
@@ -42,5 +48,5 @@ def put(event, context):
 
 def _get_controller(event, context):
     """Creates and returns the Controller object"""
-    user = User.Factory().load_by_session(event['session_uuid'])
+    user = get_user(event)
     return Volunteer.Controller(user)
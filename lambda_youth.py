@@ -4,7 +4,7 @@
 AWS Lambda needs nice, clean hooks.  This file provides those.
 """
 from controllers import Youth
-from models import User
+from lambda_base import get_user
 
 
 def find_duplicate_youth(event, context):
@@ -24,5 +24,5 @@ def revoke_guardian_approval(event, context):
 
 def _get_controller(event, context):
     """Creates and returns the Controller object"""
-    user = User.Factory().load_by_session(event['session_uuid'])
+    user = get_user(event)
     return Youth.Controller(user)
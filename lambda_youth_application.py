@@ -2,9 +2,15 @@
 """AWS Lambda Handlers for the Youth Application API
 
 AWS Lambda needs nice, clean hooks.  This file provides those.
+
+Each workflow step is saved with a single write that is conditional on the
+application still being in the status the step started from.  Steps that
+don't depend on the rest of the application skip loading it, and steps that
+touch the youth record too run in a unit of work so it's loaded only once.
 """
 from controllers import YouthApplication
-from models import User
+from lambda_base import get_user
+from models import UnitOfWork
 from models import Youth
 
 
@@ -18,22 +24,26 @@ def get_applications_by_status(event, context):
 def submit_application(event, context):
     """Lambda facade for YouthApplication.Controller method"""
     controller = _get_controller(event, context)
-    app = Youth.ApplicationFactory().load_by_uuid(event['application_uuid'])
-    app = controller.submit_application(app)
-    Youth.ApplicationPersister().save(app)
+    with UnitOfWork.UnitOfWork() as work:
+        app = Youth.ApplicationFactory().load_by_uuid(event['application_uuid'])
+        from_status = app.status
+        app = controller.submit_application(app)
+        work.register(app, Youth.ApplicationPersister(), {'status': from_status})
     return app.uuid
 
 
 def submit_guardian_approval(event, context):
     """Lambda facade for YouthApplication.Controller method"""
     controller = _get_controller(event, context)
-    app = Youth.ApplicationFactory().load_by_uuid(event['application_uuid'])
-    data = event['data']
-    (app, youth) = controller.submit_guardian_approval(app, data)
+    with UnitOfWork.UnitOfWork() as work:
+        app = Youth.ApplicationFactory().load_by_uuid(event['application_uuid'])
+        from_status = app.status
+        data = event['data']
+        (app, youth) = controller.submit_guardian_approval(app, data)
 
-    Youth.ApplicationPersister().save(app)
-    if youth:
-        Youth.YouthPersister().save(youth)
+        work.register(app, Youth.ApplicationPersister(), {'status': from_status})
+        if youth:
+            work.register(youth, Youth.YouthPersister())
 
     return app.uuid
 
@@ -41,10 +51,13 @@ def submit_guardian_approval(event, context):
 def submit_guardian_rejection(event, context):
     """Lambda facade for YouthApplication.Controller method"""
     controller = _get_controller(event, context)
-    app = Youth.ApplicationFactory().load_by_uuid(event['application_uuid'])
+    app = Youth.ApplicationFactory().construct_for_transition(
+        event['application_uuid'],
+        Youth.APPLICATION_STATUS_GUARDIAN_APPROVAL,
+    )
     data = event['data']
     app = controller.submit_guardian_rejection(app, data)
-    Youth.ApplicationPersister().save(app)
+    Youth.ApplicationPersister().save_transition(app, Youth.APPLICATION_STATUS_GUARDIAN_APPROVAL)
     return app.uuid
 
 
@@ -52,44 +65,53 @@ def submit_unit_approval(event, context):
     """Lambda facade for YouthApplication.Controller method"""
     controller = _get_controller(event, context)
     app = Youth.ApplicationFactory().load_by_uuid(event['application_uuid'])
+    from_status = app.status
     data = event['data']
     app = controller.submit_unit_approval(app, data)
-    Youth.ApplicationPersister().save(app)
+    Youth.ApplicationPersister().save_transition(app, from_status)
     return app.uuid
 
 
 def submit_unit_rejection(event, context):
     """Lambda facade for YouthApplication.Controller method"""
     controller = _get_controller(event, context)
-    app = Youth.ApplicationFactory().load_by_uuid(event['application_uuid'])
+    app = Youth.ApplicationFactory().construct_for_transition(
+        event['application_uuid'],
+        Youth.APPLICATION_STATUS_UNIT_APPROVAL,
+    )
     data = event['data']
     app = controller.submit_unit_rejection(app, data)
-    Youth.ApplicationPersister().save(app)
+    Youth.ApplicationPersister().save_transition(app, Youth.APPLICATION_STATUS_UNIT_APPROVAL)
     return app.uuid
 
 
 def pay_fees(event, context):
     """Lambda facade for YouthApplication.Controller method"""
     controller = _get_controller(event, context)
-    app = Youth.ApplicationFactory().load_by_uuid(event['application_uuid'])
+    app = Youth.ApplicationFactory().construct_for_transition(
+        event['application_uuid'],
+        Youth.APPLICATION_STATUS_FEE_PENDING,
+    )
     data = event['data']
     app = controller.pay_fees(app, data)
-    Youth.ApplicationPersister().save(app)
+    Youth.ApplicationPersister().save_transition(app, Youth.APPLICATION_STATUS_FEE_PENDING)
     return app.uuid
 
 
 def mark_as_recorded(event, context):
     """Lambda facade for YouthApplication.Controller method"""
     controller = _get_controller(event, context)
-    app = Youth.ApplicationFactory().load_by_uuid(event['application_uuid'])
-    data = event['data']
-    (app, youth) = controller.mark_as_recorded(app, data)
-    Youth.ApplicationPersister().save(app)
-    Youth.YouthPersister().save(youth)
+    with UnitOfWork.UnitOfWork() as work:
+        app = Youth.ApplicationFactory().load_by_uuid(event['application_uuid'])
+        from_status = app.status
+        data = event['data']
+        (app, youth) = controller.mark_as_recorded(app, data)
+        work.register(app, Youth.ApplicationPersister(), {'status': from_status})
+        work.register(youth, Youth.YouthPersister())
     return app.uuid
 
 
 def _get_controller(event, context):
     """Creates and returns the YouthApplication.Controller object"""
-    user = User.Factory().load_by_session(event['session_uuid'])
+    user = get_user(event)
     return YouthApplication.Controller(user)
@@ -10,7 +10,6 @@ class AdultApplications(Base.Object):
 
     def __init__(self):
         super(self.__class__, self).__init__()
-        self.uuid = self.get_uuid()
         self.status = ''
         self.org_uuid = ''
         self.data = {}
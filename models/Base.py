@@ -1,21 +1,330 @@
 """Base classes"""
 
-import boto3
+import base64
+import copy
+import decimal
+import json
+import time
+from multiprocessing.pool import ThreadPool
+
+import boto3.dynamodb.conditions
+import botocore.exceptions
 import shortuuid
 
+from . import ConditionFailedException
+from . import Connection
 from . import InvalidObjectException
+from . import InvalidQueryException
 from . import MultipleMatchException
 from . import RecordNotFoundException
+from . import Tables
+from . import Throttle
+from . import UnitOfWork
 
 FIELD_REQUIRED = 'required'
 FIELD_OPTIONAL = 'optional'
 
+BATCH_WRITE_SIZE = 25
+BATCH_GET_SIZE = 100
+BATCH_MAX_ATTEMPTS = 8
+
+QUERY_PAGE_SIZE = 100
+SCAN_SEGMENTS = 4
+
+# Search operators: field__operator => (Key/Attr method, usable in key condition)
+QUERY_OPERATORS = {
+    'eq': ('eq', True),
+    'ne': ('ne', False),
+    'lt': ('lt', True),
+    'lte': ('lte', True),
+    'gt': ('gt', True),
+    'gte': ('gte', True),
+    'begins_with': ('begins_with', True),
+    'between': ('between', True),
+    'contains': ('contains', False),
+}
+
+
+def encode_cursor(last_evaluated_key):
+    """Turn a DynamoDB LastEvaluatedKey into an opaque cursor string"""
+    if not last_evaluated_key:
+        return None
+
+    def _default(value):
+        if isinstance(value, decimal.Decimal):
+            return int(value) if value % 1 == 0 else float(value)
+        raise TypeError('Cannot encode {!r}'.format(value))
+
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, default=_default))
+
+
+def decode_cursor(cursor):
+    """Turn a cursor string back into a DynamoDB ExclusiveStartKey"""
+    if not cursor:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(str(cursor)), parse_float=decimal.Decimal)
+    except (TypeError, ValueError):
+        raise InvalidQueryException('Invalid cursor')
+
+
+def parse_search_data(search_data):
+    """Split search data into predicates
+
+    Keys are field names, optionally suffixed with an operator, e.g.
+    'number__begins_with'; a bare field name means equality.  'between'
+    takes a two-item list.
+
+    Returns:
+        tuple: index name (or None), list of (field, operator, value)
+    """
+    index_name = None
+    predicates = []
+    for key, value in search_data.items():
+        if key == '__index__':
+            index_name = value
+            continue
+        (field, _, operator) = key.partition('__')
+        operator = operator or 'eq'
+        if operator not in QUERY_OPERATORS:
+            raise InvalidQueryException('Unknown search operator "{}"'.format(operator))
+        predicates.append((field, operator, value))
+    return (index_name, predicates)
+
+
+def _get_condition(condition_class, field, operator, value):
+    """Build a boto3 condition for one predicate"""
+    method = getattr(condition_class(field), QUERY_OPERATORS[operator][0])
+    if operator == 'between':
+        return method(value[0], value[1])
+    return method(value)
+
+
+def _and_conditions(conditions):
+    """AND a list of boto3 conditions together"""
+    expression = None
+    for condition in conditions:
+        if expression:
+            expression = expression & condition
+        else:
+            expression = condition
+    return expression
+
+
+def plan_query(search_data, indexes, allow_scan=False):
+    """Decide how DynamoDB should answer a search
+
+    An index is usable when the search has an equality predicate on its hash
+    key.  The primary key beats secondary indexes, and an index whose range
+    key is also constrained beats one where it isn't.  Predicates on the
+    chosen keys go into the KeyConditionExpression; everything else becomes
+    a FilterExpression.
+
+    A KEYS_ONLY index doesn't hold the other attributes, so a filter on them
+    would never match.  Those predicates are returned instead, to be applied
+    to the full records once they've been loaded (see match_predicates).
+
+    Args:
+        search_data: dict of search predicates (see parse_search_data)
+        indexes: list of (index name, hash key, range key or None,
+            projection); the projection defaults to Tables.ALL
+        allow_scan: fall back to a scan if no index is usable
+    Returns:
+        tuple: 'query' or 'scan', the kwargs for table.query()/scan(), and
+            the list of (field, operator, value) predicates left to apply
+    Raises:
+        InvalidQueryException
+    """
+    (requested_index, predicates) = parse_search_data(search_data)
+    candidates = [(None, Tables.PRIMARY_KEY, None, Tables.ALL)] + list(indexes)
+    if requested_index:
+        candidates = [index for index in indexes if index[0] == requested_index]
+        if not candidates:
+            raise InvalidQueryException('Unknown index "{}"'.format(requested_index))
+
+    best = None
+    best_score = 0
+    for index in candidates:
+        (index_name, hash_key, range_key) = index[:3]
+        if not [p for p in predicates if p[0] == hash_key and p[1] == 'eq']:
+            continue
+        score = 2
+        if [p for p in predicates if p[0] == range_key and QUERY_OPERATORS[p[1]][1]]:
+            score = score + 1
+        if index_name is None:
+            score = score + 2
+        if score > best_score:
+            (best, best_score) = (index, score)
+
+    if not best:
+        if not allow_scan:
+            raise InvalidQueryException('No index can answer this search')
+        query_args = {}
+        filter_expression = _and_conditions([
+            _get_condition(boto3.dynamodb.conditions.Attr, *predicate) for predicate in predicates
+        ])
+        if filter_expression:
+            query_args['FilterExpression'] = filter_expression
+        return ('scan', query_args, [])
+
+    (index_name, hash_key, range_key) = best[:3]
+    keys_only = len(best) > 3 and best[3] == Tables.KEYS_ONLY
+    key_conditions = []
+    filter_conditions = []
+    post_filters = []
+    used_hash = False
+    used_range = False
+    for (field, operator, value) in predicates:
+        if field == hash_key and operator == 'eq' and not used_hash:
+            key_conditions.append(boto3.dynamodb.conditions.Key(field).eq(value))
+            used_hash = True
+        elif field == range_key and QUERY_OPERATORS[operator][1] and not used_range:
+            key_conditions.append(_get_condition(boto3.dynamodb.conditions.Key, field, operator, value))
+            used_range = True
+        elif keys_only and field not in (hash_key, range_key, Tables.PRIMARY_KEY):
+            post_filters.append((field, operator, value))
+        else:
+            filter_conditions.append(_get_condition(boto3.dynamodb.conditions.Attr, field, operator, value))
+
+    query_args = {'KeyConditionExpression': _and_conditions(key_conditions)}
+    if index_name:
+        query_args['IndexName'] = index_name
+    if filter_conditions:
+        query_args['FilterExpression'] = _and_conditions(filter_conditions)
+    return ('query', query_args, post_filters)
+
+
+# Python versions of the search operators, for predicates an index can't
+# filter on
+_PREDICATE_TESTS = {
+    'eq': lambda field, value: field == value,
+    'ne': lambda field, value: field != value,
+    'lt': lambda field, value: field < value,
+    'lte': lambda field, value: field <= value,
+    'gt': lambda field, value: field > value,
+    'gte': lambda field, value: field >= value,
+    'begins_with': lambda field, value: field.startswith(value),
+    'between': lambda field, value: value[0] <= field <= value[1],
+    'contains': lambda field, value: value in field,
+}
+
+
+def match_predicates(item, predicates):
+    """Whether a record satisfies (field, operator, value) predicates
+
+    As in DynamoDB, a predicate on a missing attribute doesn't match.
+    """
+    for (field, operator, value) in predicates:
+        if field not in item or not _PREDICATE_TESTS[operator](item[field], value):
+            return False
+    return True
+
+
+def _is_internal_attribute(name):
+    """Whether the attribute is Base.Object bookkeeping rather than a field"""
+    return name.startswith('_Object__')
+
+
+def _copy_value(value):
+    """Copy mutable values so later in-place edits show up as changes"""
+    if isinstance(value, (list, dict, set)):
+        return copy.deepcopy(value)
+    return value
+
+
+class Schema(object):  # pylint: disable=too-few-public-methods
+    """Field layout of an Object class
+
+    Built once per class (see Object.get_schema) from a default instance, so
+    construct(), to_dict(), fields() and validation don't re-derive it from
+    __dict__ for every object.
+
+    Attributes:
+        attributes: list of (attribute name, field name) pairs, e.g.
+            ('_number', 'number')
+        field_names: dict of attribute name => field name
+        attribute_names: dict of field name => attribute name
+        field_list: list of field names
+        fields: frozenset of field names
+        defaults: dict of field name => default value
+    """
+
+    def __init__(self, klass):
+        obj = klass()
+        self.attributes = []
+        self.defaults = {}
+        for key, val in obj.__dict__.items():
+            if _is_internal_attribute(key):
+                continue
+            field = key[1:] if key[0] == '_' else key
+            self.attributes.append((key, field))
+            self.defaults[field] = val
+        if 'uuid' not in self.defaults:
+            # generated lazily; see _LazyUUID
+            self.attributes.append(('uuid', 'uuid'))
+            self.defaults['uuid'] = None
+        self.field_names = dict(self.attributes)
+        self.attribute_names = dict([(field, key) for key, field in self.attributes])
+        self.field_list = [field for _, field in self.attributes]
+        self.fields = frozenset(self.field_list)
+
+
+_SCHEMAS = {}
+
+# (Validator class, requirements key) => frozenset of required fields
+_REQUIRED_FIELDS = {}
+
+
+class _LazyUUID(object):  # pylint: disable=too-few-public-methods
+    """Generates an object's uuid the first time it's read
+
+    Once the uuid has been set (or generated) it lives in the instance's
+    __dict__ like any other field, and this is bypassed.
+    """
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        uuid = obj.get_uuid()
+        obj.__dict__['uuid'] = uuid
+        return uuid
+
 
 class Object(object):
-    """Base class"""
+    """Base class
+
+    Attributes private to this class (self.__foo) hold bookkeeping state
+    and are not treated as fields.
+
+    The uuid is only generated when it's first needed, so objects loaded
+    from the DB (which are given their stored uuid) never generate one.
+    """
+
+    uuid = _LazyUUID()
 
     def __init__(self):
-        pass
+        self.__persisted_data = None
+        self.__known_fields = None
+        self.__validated_data = None
+        self.__validated_key = None
+
+    @classmethod
+    def get_schema(cls):
+        """Get the class's Schema, building it on first use"""
+        schema = _SCHEMAS.get(cls)
+        if schema is None:
+            schema = Schema(cls)
+            _SCHEMAS[cls] = schema
+        return schema
+
+    @classmethod
+    def get_compact_class(cls):
+        """Get the class's CompactObject variant, building it on first use"""
+        compact_class = _COMPACT_CLASSES.get(cls)
+        if compact_class is None:
+            compact_class = _build_compact_class(cls)
+            _COMPACT_CLASSES[cls] = compact_class
+        return compact_class
 
     def get_validator(self):  # pylint: disable=no-self-use
         """
@@ -25,36 +334,117 @@ class Object(object):
         """
         raise Exception('SYSTEM ERROR: validator not defined.')
 
-    def validate(self):
-        """Validate the object"""
-        return self.get_validator().validate()
+    def validate(self, incremental=True):
+        """Validate the object
+
+        Args:
+            incremental: only re-check the fields that changed since the
+                object last passed validation (see Validator.validate)
+        """
+        return self.get_validator().validate(incremental)
 
     def set_from_data(self, data):
         """Update object from dict"""
         for key, _ in self.__dict__.items():
-            if key in data:
+            if key in data and not _is_internal_attribute(key):
                 setattr(self, key, data[key])
 
     def to_dict(self):
         """Convert object to dict"""
+        field_names = self.get_schema().field_names
         data = {}
         for key, val in self.__dict__.items():
-            if key[0] != '_':
-                data[key] = val
-            else:
-                data[key[1:]] = val
+            field = field_names.get(key)
+            if field is None:
+                if _is_internal_attribute(key):
+                    continue
+                field = key[1:] if key[0] == '_' else key
+            data[field] = val
+        if 'uuid' not in data:
+            data['uuid'] = self.uuid
         return data
 
     def fields(self):
         """Return list of object properties"""
-        fields = []
-        for key, _ in self.__dict__.items():
-            if key[0] == '_':
-                fields.append(key[1:])
-            else:
-                fields.append(key)
+        schema = self.get_schema()
+        fields = list(schema.field_list)
+        for key in self.__dict__:
+            if key not in schema.field_names and not _is_internal_attribute(key):
+                fields.append(key[1:] if key[0] == '_' else key)
         return fields
 
+    def mark_clean(self):
+        """Record the object's current state as what's stored in the DB
+
+        Called once the object has been loaded or saved; get_changes()
+        compares against this state.
+        """
+        self.__persisted_data = dict([
+            (key, _copy_value(val)) for key, val in self.to_dict().items()
+        ])
+
+    def mark_partial(self, known_fields):
+        """Flag the object as holding only some of the stored fields
+
+        Partial objects are validated only on the fields that are known or
+        have been changed, and can only be saved as a field-level update.
+        """
+        self.__known_fields = set(known_fields)
+
+    def is_partial(self):
+        """Whether the object holds only some of the stored fields"""
+        return self.__known_fields is not None
+
+    def get_unknown_fields(self):
+        """Fields of a partial object that weren't loaded and haven't been set"""
+        if self.__known_fields is None:
+            return set()
+        return set(self.fields()) - self.__known_fields - set(self.get_changes() or {})
+
+    def mark_valid(self, requirements_key=None):
+        """Record the object's current state as having passed validation
+
+        Args:
+            requirements_key: Validator.get_requirements_key() at the time
+        """
+        self.__validated_data = dict([
+            (key, _copy_value(val)) for key, val in self.to_dict().items()
+        ])
+        self.__validated_key = requirements_key
+
+    def get_changes_since_validation(self, requirements_key=None):
+        """Fields changed since the object last passed validation
+
+        Returns:
+            set of field names, or None if the object hasn't passed
+            validation under the same requirements
+        """
+        if self.__validated_data is None or requirements_key != self.__validated_key:
+            return None
+        return set([
+            key for key, val in self.to_dict().items()
+            if key not in self.__validated_data or self.__validated_data[key] != val
+        ])
+
+    def is_persisted(self):
+        """Whether the object was loaded from or saved to the DB"""
+        return self.__persisted_data is not None
+
+    def get_changes(self):
+        """Fields changed since the object was loaded or saved
+
+        Returns:
+            dict of field => new value, or None if the object has never been
+            loaded or saved
+        """
+        if self.__persisted_data is None:
+            return None
+        changes = {}
+        for key, val in self.to_dict().items():
+            if key not in self.__persisted_data or self.__persisted_data[key] != val:
+                changes[key] = val
+        return changes
+
     def get_uuid(self):
         """Generates a UUID"""
         return "{}-{}".format(self.get_uuid_prefix(), shortuuid.uuid())
@@ -65,6 +455,103 @@ class Object(object):
         raise Exception('Invalid implementation.')
 
 
+class CompactObject(object):
+    """Read-only, slot-based record for bulk processing
+
+    Each model class gets a CompactObject subclass (see
+    Object.get_compact_class) with a slot per field and no per-instance
+    __dict__, which takes a fraction of the memory of the full object.  The
+    model's own methods (get_validator, get_uuid_prefix, etc.) are copied
+    over, so compact records work with to_dict() and the validators.
+
+    Compact records can't be changed or saved.
+    """
+    __slots__ = ()
+    _model_class = None
+
+    def __init__(self, data, invalid_field_exceptions=True):
+        schema = self._model_class.get_schema()
+        for field in self.__slots__:
+            if field in data:
+                value = data[field]
+            else:
+                value = _copy_value(schema.defaults[field])
+            object.__setattr__(self, field, value)
+        if invalid_field_exceptions:
+            for key in data:
+                if key not in schema.fields:
+                    raise Exception('Unknown "{}" field "{}"'.format(self._model_class.__name__, key))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Compact "{}" records are read-only'.format(self._model_class.__name__))
+
+    def to_dict(self):
+        """Convert record to dict"""
+        return dict([(field, getattr(self, field)) for field in self.__slots__])
+
+    def fields(self):
+        """Return list of record fields"""
+        return list(self.__slots__)
+
+    def validate(self, incremental=False):
+        """Validate the record"""
+        return self.get_validator().validate(incremental)
+
+    def mark_valid(self, requirements_key=None):  # pylint: disable=no-self-use,unused-argument
+        """Compact records don't track validation"""
+        pass
+
+    def get_changes_since_validation(self, requirements_key=None):  # pylint: disable=no-self-use,unused-argument
+        """Compact records don't track validation"""
+        return None
+
+    def get_unknown_fields(self):  # pylint: disable=no-self-use
+        """Compact records are never partial"""
+        return set()
+
+    def is_partial(self):  # pylint: disable=no-self-use
+        """Compact records are never partial"""
+        return False
+
+    def is_persisted(self):  # pylint: disable=no-self-use
+        """Compact records always come from the DB"""
+        return True
+
+    def get_changes(self):  # pylint: disable=no-self-use
+        """Compact records can't be changed"""
+        return {}
+
+    def get_validator(self):
+        """Must be copied from the model class"""
+        raise Exception('SYSTEM ERROR: validator not defined.')
+
+    def _set_derived_fields(self, values):
+        """Set derived fields; see BatchValidator"""
+        for key, val in values.items():
+            object.__setattr__(self, key, val)
+
+
+_COMPACT_CLASSES = {}
+
+
+def _build_compact_class(klass):
+    """Create the CompactObject subclass for a model class"""
+    attrs = {
+        '__slots__': tuple(klass.get_schema().field_list),
+        '_model_class': klass,
+    }
+    for base in reversed(klass.__mro__):
+        if not issubclass(base, Object) or base is Object:
+            continue
+        for name, val in vars(base).items():
+            if name.startswith('__') or name in attrs['__slots__'] or isinstance(val, property):
+                continue
+            if hasattr(CompactObject, name) and name != 'get_validator':
+                continue
+            attrs[name] = val
+    return type('Compact' + klass.__name__, (CompactObject,), attrs)
+
+
 class Validator(object):
     """Validates data construct"""
 
@@ -79,26 +566,79 @@ class Validator(object):
         """
         raise Exception('SYSTEM ERROR: field requirements not defined.')
 
-    def _validate_required_fields(self):
-        """Validate that the data provided includes all required fields"""
+    def get_requirements_key(self):  # pylint: disable=no-self-use
+        """Value the field requirements depend on, besides the class
+
+        Requirements are compiled once per (class, key); override this if
+        get_field_requirements() depends on the object (e.g. its status).
+        """
+        return None
+
+    def get_required_fields(self):
+        """Get the required fields, compiled from get_field_requirements()
+
+        Returns:
+            frozenset of field names
+        """
+        cache_key = (self.__class__, self.get_requirements_key())
+        required_fields = _REQUIRED_FIELDS.get(cache_key)
+        if required_fields is None:
+            required_fields = frozenset([
+                key for key, value in self.get_field_requirements().items()
+                if value == FIELD_REQUIRED
+            ])
+            _REQUIRED_FIELDS[cache_key] = required_fields
+        return required_fields
+
+    def _validate_required_fields(self, fields=None):
+        """Validate that the data provided includes all required fields
+
+        Fields a partial object doesn't know about are skipped; see
+        get_unverified_required_fields().
+
+        Args:
+            fields: only check these fields (default: all)
+        """
         valid = True
         errors = []
+        required_fields = self.get_required_fields()
+        if fields is not None:
+            required_fields = required_fields & fields
+        required_fields = required_fields - self.obj.get_unknown_fields()
 
-        for key, value in self.get_field_requirements().items():
-            if value == FIELD_REQUIRED:
-                if key not in self.obj.to_dict() or not self.obj.to_dict()[key]:
-                    errors.append('Missing required field "{}"'.format(key))
-                    valid = False
+        for key in sorted(required_fields):
+            if not getattr(self.obj, key, None):
+                errors.append('Missing required field "{}"'.format(key))
+                valid = False
 
         return (valid, errors)
 
+    def get_unverified_required_fields(self):
+        """Required fields that couldn't be checked because the object is partial
+
+        The persister makes the write conditional on these existing.
+        """
+        return sorted(self.get_required_fields() & self.obj.get_unknown_fields())
+
+    def get_derived_fields(self):  # pylint: disable=no-self-use
+        """Values computed from the object's other fields
+
+        Override to derive fields (e.g. a duplicate-check hash) from the
+        rest of the record.
+
+        Returns:
+            dict of field => value
+        """
+        return {}
+
     def prepare_for_validate(self):
         """
         Called by the persister prior to validation & storage
 
-        Useful for setting derived values.
+        Sets the derived fields by default.
         """
-        pass
+        for key, val in self.get_derived_fields().items():
+            setattr(self.obj, key, val)
 
     def _validate(self):  # pylint: disable=no-self-use
         """Any additional validation can be done in this method in the child"""
@@ -111,20 +651,94 @@ class Validator(object):
         (other_valid, _) = self._validate()
         return requirements_valid and other_valid
 
-    def validate(self):
-        """Validates the object"""
-        errors = self.get_validation_errors()
+    def validate(self, incremental=False):
+        """Validates the object
+
+        Args:
+            incremental: if the object passed validation before, only
+                re-check the required fields that have changed since, and
+                skip validation entirely if nothing has
+        Raises:
+            InvalidObjectException: with the first error
+        """
+        errors = self.get_validation_errors(incremental)
         if errors:
             raise InvalidObjectException(errors[0])
+        if incremental:
+            self.obj.mark_valid(self.get_requirements_key())
 
-    def get_validation_errors(self):
-        """Provide errors associated with validation"""
+    def get_validation_errors(self, incremental=False):
+        """Provide all errors associated with validation, in one pass"""
         self.prepare_for_validate()
-        (_, requirements_errors) = self._validate_required_fields()
+        fields = None
+        if incremental:
+            fields = self.obj.get_changes_since_validation(self.get_requirements_key())
+            if fields is not None and not fields:
+                return []
+        (_, requirements_errors) = self._validate_required_fields(fields)
         (_, other_errors) = self._validate()
         return requirements_errors + other_errors
 
 
+class BatchValidator(object):
+    """Validates many records of one model at once
+
+    Records are loaded into compact records (see CompactObject) rather than
+    full objects.  Required fields are checked a column at a time for all
+    records sharing the same requirements, and the model's own _validate()
+    rules only run for records that passed that check.
+
+        errors = Base.BatchValidator(Youth.YouthFactory()).validate(rows)
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        klass = factory._get_object_class()  # pylint: disable=protected-access
+        self.model_name = klass.__name__
+        self.fields = klass.get_schema().fields
+
+    def validate(self, records):
+        """Validate the records
+
+        Args:
+            records: list of dicts or objects of the factory's model
+        Returns:
+            dict of record index => list of error messages, for the records
+            that aren't valid
+        """
+        errors = {}
+        groups = {}
+        for index, record in enumerate(records):
+            data = record if isinstance(record, dict) else record.to_dict()
+            unknown_fields = sorted([key for key in data if key not in self.fields])
+            if unknown_fields:
+                errors[index] = [
+                    'Unknown "{}" field "{}"'.format(self.model_name, key) for key in unknown_fields
+                ]
+                continue
+            compact = self.factory.construct_compact(data)
+            validator = compact.get_validator()
+            try:
+                compact._set_derived_fields(validator.get_derived_fields())  # pylint: disable=protected-access
+            except Exception as exc:  # pylint: disable=broad-except
+                errors[index] = [str(exc)]
+                continue
+            groups.setdefault(validator.get_requirements_key(), []).append((index, compact, validator))
+
+        for rows in groups.values():
+            for field in sorted(rows[0][2].get_required_fields()):
+                for (index, compact, _) in rows:
+                    if not getattr(compact, field, None):
+                        errors.setdefault(index, []).append('Missing required field "{}"'.format(field))
+            for (index, compact, validator) in rows:
+                if index in errors:
+                    continue
+                (valid, other_errors) = validator._validate()  # pylint: disable=protected-access
+                if not valid or other_errors:
+                    errors[index] = other_errors
+        return errors
+
+
 class Factory(object):
     """Base Factory"""
 
@@ -132,8 +746,66 @@ class Factory(object):
         self.__persister = None
 
     def load_by_uuid(self, uuid):
-        """Load by UUID"""
-        return self.load_from_database({'uuid': uuid})
+        """Load by UUID
+
+        Within a unit of work, each UUID is only loaded once.
+        """
+        work = UnitOfWork.get_current()
+        if work:
+            obj = work.get(self._get_object_class(), uuid)
+            if obj:
+                return obj
+        obj = self.load_from_database({'uuid': uuid})
+        if work:
+            work.add(obj, self._persister)
+        return obj
+
+    def load_many_by_uuid(self, uuids, compact=False):
+        """Load multiple objects by UUID using batch reads
+
+        Args:
+            uuids: list of UUIDs
+            compact: load read-only compact records (see CompactObject)
+                instead of full objects; these bypass the unit of work
+        Returns:
+            list of objects in the same order as uuids; UUIDs that weren't
+            found are skipped
+        """
+        if compact:
+            items = self._persister.get_many([{'uuid': uuid} for uuid in set(uuids)])
+            objs_by_uuid = dict([(item['uuid'], self.construct_compact(item)) for item in items])
+            return [objs_by_uuid[uuid] for uuid in uuids if uuid in objs_by_uuid]
+
+        work = UnitOfWork.get_current()
+        objs_by_uuid = {}
+        missing_uuids = []
+        for uuid in uuids:
+            obj = work.get(self._get_object_class(), uuid) if work else None
+            if obj:
+                objs_by_uuid[uuid] = obj
+            elif uuid not in missing_uuids:
+                missing_uuids.append(uuid)
+
+        if missing_uuids:
+            for item in self._persister.get_many([{'uuid': uuid} for uuid in missing_uuids]):
+                obj = self._construct_persisted(item)
+                objs_by_uuid[obj.uuid] = obj
+                if work:
+                    work.add(obj, self._persister)
+        return [objs_by_uuid[uuid] for uuid in uuids if uuid in objs_by_uuid]
+
+    def load_many_from_database_query(self, search_data, compact=False):
+        """Load from DB by secondary key, fetching the full records
+
+        Secondary indexes only project keys, so the matching records are
+        loaded in batches afterward.
+
+        Args:
+            search_data: dict of field values to search for
+            compact: load read-only compact records instead of full objects
+        """
+        items = self._persister.query(search_data)
+        return self.load_many_by_uuid([item['uuid'] for item in items], compact)
 
     @classmethod
     def get_uuid_prefix(cls):
@@ -143,26 +815,61 @@ class Factory(object):
     def load_from_database(self, search_data):
         """Load from DB by primary key"""
         item_data = self._persister.get(search_data)
-        return self.construct(item_data)
+        return self._construct_persisted(item_data)
 
     def load_from_database_query(self, search_data):
-        """Load from DB by secondary key"""
+        """Load from DB by secondary key, fetching the full record
+
+        Secondary indexes only project keys, so the match is loaded by uuid
+        afterward.  Otherwise the object would be missing fields, and look
+        changed as soon as they were set.
+        """
         items = self._persister.query(search_data)
         if len(items) == 0:
             raise RecordNotFoundException('Record not found')
         elif len(items) > 1:
             raise MultipleMatchException('Multiple matches found')
-        return self.construct(items[0])
+        return self.load_by_uuid(items[0]['uuid'])
+
+    def construct_partial(self, data):
+        """Create object from a subset of a DB record without loading it
+
+        Useful for changes that don't depend on the rest of the record, so
+        they can be written without reading it first.
+
+        Args:
+            data: dict containing the primary key and any known fields
+        Returns:
+            object flagged as partial
+        """
+        obj = self._construct_persisted(data)
+        obj.mark_partial(data.keys())
+        return obj
+
+    def construct_compact(self, data, invalid_field_exceptions=True):
+        """Create a read-only compact record from dict
+
+        See CompactObject.
+        """
+        klass = self._get_object_class()  # pylint: disable=assignment-from-no-return
+        return klass.get_compact_class()(data, invalid_field_exceptions)
+
+    def _construct_persisted(self, data):
+        """Create object from a DB record, tracking later changes"""
+        obj = self.construct(data)
+        obj.mark_clean()
+        return obj
 
     def construct(self, data, invalid_field_exceptions=True):
         """Create object from dict"""
         klass = self._get_object_class()  # pylint: disable=assignment-from-no-return
         obj = klass()
+        fields = klass.get_schema().fields
 
-        for key, _ in data.items():
-            if key in obj.fields():
+        for key, val in data.items():
+            if key in fields:
                 try:
-                    setattr(obj, key, data[key])
+                    setattr(obj, key, val)
                 except AttributeError:
                     pass
             else:
@@ -191,14 +898,250 @@ class Persister(object):
     """Persists objects"""
 
     def __init__(self):
-        dynamodb = boto3.resource('dynamodb')
-        self.table = dynamodb.Table(self._get_table_name())
+        self.dynamodb = Connection.get_resource()
+        self.table = Connection.get_table(self._get_table_name())
+
+    def save(self, obj, expected=None):
+        """Save to DB
+
+        New objects are written in full.  Objects that were loaded from the
+        DB only have their changed fields written, and aren't written at all
+        if nothing changed.
+
+        Args:
+            obj: object to save
+            expected: optional dict of field => value the stored record must
+                still have for the write to succeed
+        Raises:
+            ConditionFailedException: the stored record didn't match
+            RecordNotFoundException: the record to update no longer exists
+        """
+        write = self.get_write(obj, expected)
+        try:
+            if write:
+                (operation, write_args) = write
+                self._call(Throttle.WRITE, 1, getattr(self.table, operation), **write_args)
+        except botocore.exceptions.ClientError as exc:
+            if exc.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            if expected:
+                raise ConditionFailedException('Record has changed; expected {}'.format(expected))
+            raise RecordNotFoundException('Record not found')
+        obj.mark_clean()
+        if write:
+            self.after_write([obj])
+
+    def get_write(self, obj, expected=None):
+        """Validate the object and decide how to write it
 
-    def save(self, obj):
-        """Save to DB"""
-        obj.get_validator().validate()
-        persist_obj = self.__class__.get_persistable_object(obj)
-        self.table.put_item(Item=persist_obj)
+        Args:
+            obj: object to save
+            expected: optional dict of field => value the stored record must
+                still have for the write to succeed
+        Returns:
+            tuple: 'put_item' or 'update_item', and its arguments; or None if
+                nothing needs to be written
+        """
+        validator = obj.get_validator()
+        validator.validate()
+        changes = obj.get_changes()
+        if changes is None or 'uuid' in changes:
+            if obj.is_partial():
+                raise Exception('SYSTEM ERROR: partial objects cannot be written in full.')
+            put_args = {'Item': self.__class__.get_persistable_object(obj)}
+            if expected:
+                put_args.update(self.get_condition_args(expected))
+            return ('put_item', put_args)
+        elif changes:
+            return ('update_item', self.get_update_args(
+                obj.uuid,
+                changes,
+                expected,
+                validator.get_unverified_required_fields(),
+            ))
+        return None
+
+    @staticmethod
+    def get_condition_args(expected=None, required_fields=None, names=None, values=None):
+        """Build a ConditionExpression and its placeholders
+
+        Args:
+            expected: dict of field => value the record must have
+            required_fields: list of fields that must exist in the record
+            names: ExpressionAttributeNames to add to
+            values: ExpressionAttributeValues to add to
+        Returns:
+            dict of put_item()/update_item() arguments
+        """
+        names = names if names is not None else {}
+        values = values if values is not None else {}
+        clauses = []
+        for num, (key, val) in enumerate(sorted((expected or {}).items())):
+            names['#e{}'.format(num)] = key
+            values[':e{}'.format(num)] = val
+            clauses.append('#e{0} = :e{0}'.format(num))
+        for num, key in enumerate(required_fields or []):
+            names['#r{}'.format(num)] = key
+            clauses.append('attribute_exists(#r{})'.format(num))
+
+        condition_args = {}
+        if clauses:
+            condition_args['ConditionExpression'] = ' AND '.join(clauses)
+        if names:
+            condition_args['ExpressionAttributeNames'] = names
+        if values:
+            condition_args['ExpressionAttributeValues'] = values
+        return condition_args
+
+    @staticmethod
+    def get_update_args(uuid, changes, expected=None, required_fields=None):
+        """Build update_item() arguments that write only the changed fields
+
+        Blank values are removed, since DynamoDB won't store empty fields.
+        The update only succeeds if the record exists (and matches
+        `expected` and has `required_fields`, if given).
+
+        Args:
+            uuid: primary key value
+            changes: dict of field => new value
+            expected: dict of field => value the record must have
+            required_fields: list of fields that must exist in the record
+        Returns:
+            dict
+        """
+        names = {'#key': 'uuid'}
+        values = {}
+        set_clauses = []
+        remove_clauses = []
+        for num, (key, val) in enumerate(sorted(changes.items())):
+            names['#f{}'.format(num)] = key
+            if val == '':
+                remove_clauses.append('#f{}'.format(num))
+            else:
+                values[':v{}'.format(num)] = val
+                set_clauses.append('#f{0} = :v{0}'.format(num))
+
+        expression = []
+        if set_clauses:
+            expression.append('SET ' + ', '.join(set_clauses))
+        if remove_clauses:
+            expression.append('REMOVE ' + ', '.join(remove_clauses))
+
+        update_args = Persister.get_condition_args(expected, required_fields, names, values)
+        if 'ConditionExpression' in update_args:
+            update_args['ConditionExpression'] = 'attribute_exists(#key) AND ' + update_args['ConditionExpression']
+        else:
+            update_args['ConditionExpression'] = 'attribute_exists(#key)'
+        update_args['Key'] = {'uuid': uuid}
+        update_args['UpdateExpression'] = ' '.join(expression)
+        return update_args
+
+    def save_many(self, objs):
+        """Save multiple objects to DB using batch writes
+
+        Objects are validated first; invalid objects are reported as failures
+        and are not written.  Valid objects are written 25 at a time, and any
+        items DynamoDB leaves unprocessed are resubmitted with backoff.
+
+        Args:
+            objs: list of objects
+        Returns:
+            dict: 'succeeded': list of objects written,
+                'failed': list of (object, error message) tuples
+        """
+        result = {'succeeded': [], 'failed': []}
+        requests = []
+        for obj in objs:
+            try:
+                obj.get_validator().validate()
+            except InvalidObjectException as exc:
+                result['failed'].append((obj, str(exc)))
+                continue
+            persist_obj = self.__class__.get_persistable_object(obj)
+            requests.append((obj, {'PutRequest': {'Item': persist_obj}}))
+        self._batch_write(requests, result)
+        return result
+
+    def delete_many(self, objs):
+        """Delete multiple objects from DB using batch writes
+
+        Args:
+            objs: list of objects
+        Returns:
+            dict: 'succeeded': list of objects deleted,
+                'failed': list of (object, error message) tuples
+        """
+        result = {'succeeded': [], 'failed': []}
+        requests = [(obj, {'DeleteRequest': {'Key': {'uuid': obj.uuid}}}) for obj in objs]
+        self._batch_write(requests, result)
+        return result
+
+    def _batch_write(self, requests, result):
+        """Write (object, request) pairs in batches, recording the outcomes"""
+        for chunk in self._chunk_requests(requests):
+            pending = chunk
+            attempt = 0
+            while pending:
+                try:
+                    response = self._call(
+                        Throttle.WRITE,
+                        len(pending),
+                        self.dynamodb.batch_write_item,
+                        RequestItems={self._get_table_name(): [request for _, request in pending]}
+                    )
+                except botocore.exceptions.ClientError as exc:
+                    result['failed'].extend([(obj, str(exc)) for obj, _ in pending])
+                    break
+
+                unprocessed_keys = set()
+                for request in response.get('UnprocessedItems', {}).get(self._get_table_name(), []):
+                    unprocessed_keys.add(self._get_request_key(request))
+                written = []
+                for obj, request in pending:
+                    if self._get_request_key(request) not in unprocessed_keys:
+                        if 'PutRequest' in request:
+                            obj.mark_clean()
+                        written.append(obj)
+                result['succeeded'].extend(written)
+                self.after_write(written)
+                pending = [(obj, request) for obj, request in pending
+                           if self._get_request_key(request) in unprocessed_keys]
+
+                attempt = attempt + 1
+                if pending and attempt >= BATCH_MAX_ATTEMPTS:
+                    result['failed'].extend(
+                        [(obj, 'Unprocessed after {} attempts'.format(attempt)) for obj, _ in pending]
+                    )
+                    break
+                elif pending:
+                    self._wait_to_retry(attempt)
+
+    @staticmethod
+    def _chunk_requests(requests):
+        """Split requests into batches
+
+        DynamoDB rejects a batch containing the same key twice, so a repeated
+        key starts a new batch.
+        """
+        chunk = []
+        keys = set()
+        for obj, request in requests:
+            key = Persister._get_request_key(request)
+            if len(chunk) >= BATCH_WRITE_SIZE or key in keys:
+                yield chunk
+                chunk = []
+                keys = set()
+            chunk.append((obj, request))
+            keys.add(key)
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _get_request_key(request):
+        """Get the primary key value of a batch write request"""
+        if 'PutRequest' in request:
+            return request['PutRequest']['Item']['uuid']
+        return request['DeleteRequest']['Key']['uuid']
 
     @staticmethod
     def get_persistable_object(obj):
@@ -216,42 +1159,252 @@ class Persister(object):
 
     def get(self, key):
         """Load from DB by primary key"""
-        item = self.table.get_item(Key=key)
+        item = self._call(Throttle.READ, 1, self.table.get_item, Key=key)
         if 'Item' in item:
             return item['Item']
         else:
             raise RecordNotFoundException('Record not found')
 
-    def query(self, search_data):
+    def get_many(self, keys):
+        """Load multiple records from DB by primary key using batch reads
+
+        Keys are requested 100 at a time, and any keys DynamoDB leaves
+        unprocessed are re-requested with backoff.
+
+        Args:
+            keys: list of primary key dicts; must not contain duplicates
+        Returns:
+            list of item dicts, in no particular order; missing records are
+            not included
+        """
+        items = []
+        table_name = self._get_table_name()
+        for start in range(0, len(keys), BATCH_GET_SIZE):
+            pending = keys[start:start + BATCH_GET_SIZE]
+            attempt = 0
+            while pending:
+                response = self._call(
+                    Throttle.READ,
+                    len(pending),
+                    self.dynamodb.batch_get_item,
+                    RequestItems={table_name: {'Keys': pending}}
+                )
+                items.extend(response.get('Responses', {}).get(table_name, []))
+                pending = response.get('UnprocessedKeys', {}).get(table_name, {}).get('Keys', [])
+
+                attempt = attempt + 1
+                if pending and attempt >= BATCH_MAX_ATTEMPTS:
+                    raise Exception('Unable to load {} records after {} attempts'.format(len(pending), attempt))
+                elif pending:
+                    self._wait_to_retry(attempt)
+        return items
+
+    def query(self, search_data, allow_scan=False):
         """Search DB with index and return 0 or more records"""
-        expression = None
-        if '__index__' in search_data:
-            index_name = search_data['__index__']
-            del search_data['__index__']
-        for key, value in search_data.items():
-            if not index_name:
-                index_name = key
-            if expression:
-                expression = expression & boto3.dynamodb.conditions.Key(key).eq(value)
-            else:
-                expression = boto3.dynamodb.conditions.Key(key).eq(value)  # pylint: disable=redefined-variable-type
-        result = self.table.query(
-            IndexName=index_name,
-            KeyConditionExpression=expression
-        )
-
-        if 'Items' in result:
-            items = result['Items']
-        else:
+        return list(self.query_iter(search_data, allow_scan=allow_scan))
+
+    def query_iter(self, search_data, page_size=None, limit=None, cursor=None, allow_scan=False):  # pylint: disable=too-many-arguments
+        """Search DB with index, yielding records as they're read
+
+        Pages are fetched lazily, following LastEvaluatedKey until the
+        results are exhausted or `limit` records have been yielded.
+
+        Args:
+            search_data: dict of field values to search for (see plan_query);
+                '__index__' may name the index to use
+            page_size: number of records to read per request
+            limit: maximum number of records to yield
+            cursor: cursor from query_page() to resume from
+            allow_scan: if no index can answer the search, fall back to a
+                parallel table scan instead of raising an exception
+        Yields:
+            dict
+        """
+        (operation, query_args, post_filters) = self._plan(search_data, allow_scan)
+        if operation == 'scan' and not cursor:
+            # Each segment of the parallel scan reads page_size records per
+            # request
+            if page_size:
+                query_args['Limit'] = page_size
+            for num_yielded, item in enumerate(self.scan(query_args)):
+                if limit and num_yielded >= limit:
+                    return
+                yield item
+            return
+
+        if page_size:
+            query_args['Limit'] = page_size
+        query_args['ReturnConsumedCapacity'] = 'TOTAL'
+        start_key = decode_cursor(cursor)
+        num_yielded = 0
+        while True:
+            if start_key:
+                query_args['ExclusiveStartKey'] = start_key
+            result = self._call(Throttle.READ, 1, getattr(self.table, operation), **query_args)
+            if 'Items' not in result:
+                raise Exception('Error searching')
+
+            for item in self._post_filter(result['Items'], post_filters):
+                yield item
+                num_yielded = num_yielded + 1
+                if limit and num_yielded >= limit:
+                    return
+
+            start_key = result.get('LastEvaluatedKey')
+            if not start_key:
+                return
+
+    def query_page(self, search_data, page_size=QUERY_PAGE_SIZE, cursor=None, allow_scan=False):
+        """Search DB with index, returning one page of records
+
+        Args:
+            search_data: dict of field values to search for (see plan_query)
+            page_size: number of records to read
+            cursor: cursor returned by the previous call, if any
+            allow_scan: fall back to a table scan if no index applies
+        Returns:
+            tuple: list of dicts, and the cursor for the next page (None if
+                there are no more records); pages of searches that are
+                filtered after loading may hold fewer than page_size records
+        """
+        (operation, query_args, post_filters) = self._plan(search_data, allow_scan)
+        query_args['Limit'] = page_size
+        query_args['ReturnConsumedCapacity'] = 'TOTAL'
+        start_key = decode_cursor(cursor)
+        if start_key:
+            query_args['ExclusiveStartKey'] = start_key
+        result = self._call(Throttle.READ, 1, getattr(self.table, operation), **query_args)
+        if 'Items' not in result:
             raise Exception('Error searching')
+        items = self._post_filter(result['Items'], post_filters)
+        return (items, encode_cursor(result.get('LastEvaluatedKey')))
 
-        return items
+    def _post_filter(self, items, post_filters):
+        """Load the full records for index results and apply the predicates
+        the index couldn't
+
+        Args:
+            items: index results, holding at least the primary key
+            post_filters: list of (field, operator, value); if empty, the
+                items are returned as they are
+        Returns:
+            list of full records, in the order of `items`
+        """
+        if not post_filters or not items:
+            return items
+        loaded = dict([
+            (item[Tables.PRIMARY_KEY], item)
+            for item in self.get_many([{Tables.PRIMARY_KEY: item[Tables.PRIMARY_KEY]} for item in items])
+        ])
+        return [
+            loaded[item[Tables.PRIMARY_KEY]] for item in items
+            if item[Tables.PRIMARY_KEY] in loaded and match_predicates(loaded[item[Tables.PRIMARY_KEY]], post_filters)
+        ]
+
+    def scan(self, scan_args=None, total_segments=SCAN_SEGMENTS):
+        """Parallel scan of the whole table
+
+        Each segment is read (following pagination) on its own thread.
+        boto3 resources and Table objects aren't thread-safe, so the threads
+        share the (thread-safe) low-level client instead.
+
+        Args:
+            scan_args: extra table.scan() arguments, e.g. FilterExpression
+            total_segments: number of segments to read in parallel
+        Returns:
+            list of dicts
+        """
+        scan_args = self._get_client_args(dict(scan_args or {}, ReturnConsumedCapacity='TOTAL'))
+        client = Connection.get_client()
+
+        def _scan_segment(segment):
+            items = []
+            segment_args = dict(scan_args, Segment=segment, TotalSegments=total_segments)
+            while True:
+                result = self._call(Throttle.READ, 1, client.scan, **segment_args)
+                items.extend([Connection.deserialize(item) for item in result.get('Items', [])])
+                if not result.get('LastEvaluatedKey'):
+                    return items
+                segment_args['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+        pool = ThreadPool(total_segments)
+        try:
+            segments = pool.map(_scan_segment, range(total_segments))
+        finally:
+            pool.close()
+        return [item for segment_items in segments for item in segment_items]
+
+    def _get_client_args(self, table_args):
+        """Convert Table method arguments to low-level client arguments
+
+        boto3 conditions are built into expression strings, and values are
+        converted to typed attribute values.
+        """
+        builder = boto3.dynamodb.conditions.ConditionExpressionBuilder()
+        client_args = {'TableName': self._get_table_name()}
+        names = dict(table_args.get('ExpressionAttributeNames', {}))
+        values = dict(table_args.get('ExpressionAttributeValues', {}))
+        for key, val in table_args.items():
+            if key in ('ExpressionAttributeNames', 'ExpressionAttributeValues'):
+                continue
+            if key in ('FilterExpression', 'KeyConditionExpression') and \
+                    isinstance(val, boto3.dynamodb.conditions.ConditionBase):
+                expression = builder.build_expression(val, key == 'KeyConditionExpression')
+                names.update(expression.attribute_name_placeholders)
+                values.update(expression.attribute_value_placeholders)
+                val = expression.condition_expression
+            elif key == 'ExclusiveStartKey':
+                val = Connection.serialize(val)
+            client_args[key] = val
+        if names:
+            client_args['ExpressionAttributeNames'] = names
+        if values:
+            client_args['ExpressionAttributeValues'] = Connection.serialize(values)
+        return client_args
+
+    def _call(self, kind, units, func, **kwargs):
+        """Call DynamoDB for this table through the throttling layer
+
+        Args:
+            kind: Throttle.READ or Throttle.WRITE
+            units: approximate capacity units the call consumes
+            func: boto3 method to call
+        """
+        return Throttle.call(self._get_table_name(), kind, units, func, **kwargs)
+
+    def _wait_to_retry(self, attempt):
+        """Back off before resubmitting unprocessed batch items"""
+        delay = Throttle.get_backoff_seconds(attempt)
+        Throttle.record_retry(self._get_table_name(), delay)
+        time.sleep(delay)
+
+    def _plan(self, search_data, allow_scan):
+        """Plan the search; see plan_query"""
+        return plan_query(search_data, self._get_indexes(), allow_scan)
+
+    def _get_indexes(self):
+        """Global secondary indexes for this persister's table
+
+        Returns:
+            list of tuples: (index name, hash key, range key or None,
+                projection)
+        """
+        return Tables.get_indexes(self._get_table_name())
 
     def delete(self, obj):
         """Delete from DB"""
-        self.table.delete_item(Key={'uuid': obj.uuid})
+        self._call(Throttle.WRITE, 1, self.table.delete_item, Key={'uuid': obj.uuid})
+        self.after_write([obj])
+
+    def after_write(self, objs):
+        """Called with objects once they've been written or deleted
+
+        Does nothing by default; persisters that cache records override it.
+        """
+        pass
 
     @staticmethod
     def _get_table_name():
         """Must be implemented by child class."""
         raise Exception('SYSTEM ERROR: No table name specified.')
+
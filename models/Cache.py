@@ -0,0 +1,303 @@
+"""In-process caches
+
+Caches live for the life of the process (a warm Lambda container or a
+long-running worker), so entries expire after a TTL in addition to being
+evicted least-recently-used when the cache is full.
+
+Caches subscribe to a channel on the invalidation bus so that changes made
+in the same process can be dropped by key:
+
+    Cache.subscribe('organization', CACHE.invalidate_many)
+    Cache.publish('organization', ['dst-5.cnl-591'])
+
+Other processes (every other warm Lambda container) learn of changes through
+a VersionStamp: writers bump the channel's version in the CacheVersions
+table, naming the keys they changed, and caches check it every few seconds.
+A cache that has only missed a few versions drops just the keys they name;
+otherwise (too many versions, or a bump that didn't name its keys) it drops
+everything.
+"""
+import collections
+import copy
+import threading
+import time
+
+import botocore.exceptions
+
+from . import Connection
+from . import Throttle
+
+VERSION_TABLE = 'CacheVersions'
+
+# Bumps whose keys are kept, per channel, and the most keys kept for a bump
+CHANGE_LOG_SIZE = 20
+CHANGE_LOG_MAX_KEYS = 100
+
+
+class LRUCache(object):
+    """Size-bounded cache with per-entry expiry
+
+    Values are copied on the way in and out, so callers can't change what's
+    cached.  A max_size of 0 disables the cache.
+    """
+
+    def __init__(self, max_size=1000, ttl=300, version=None):
+        """
+        Args:
+            max_size: maximum number of entries
+            ttl: seconds an entry stays fresh
+            version: optional VersionStamp; the cache is cleared whenever it
+                changes
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = version
+        self._seen_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, count=False) is not None
+
+    def get(self, key, count=True):
+        """Get a cached value
+
+        Args:
+            key: cache key
+            count: whether to count the lookup as a hit or miss
+        Returns:
+            copy of the value, or None if it isn't cached or has expired
+        """
+        self._check_version()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry and entry[0] > time.time():
+                self._entries[key] = entry
+                if count:
+                    self.hits = self.hits + 1
+                return copy.deepcopy(entry[1])
+            if count:
+                self.misses = self.misses + 1
+            return None
+
+    def set(self, key, value):
+        """Cache a value"""
+        if not self.max_size:
+            return
+        self._check_version()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + self.ttl, copy.deepcopy(value))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions = self.evictions + 1
+
+    def _check_version(self):
+        """Drop what changed if the version stamp has moved
+
+        Everything is dropped if the stamp can't be read or the changes
+        aren't known.
+        """
+        if self.version is None:
+            return
+        version = self.version.get()
+        if version is not None and version == self._seen_version:
+            return
+        keys = self.version.get_changed_keys(self._seen_version, version)
+        with self._lock:
+            if keys is None:
+                self._entries.clear()
+            else:
+                for key in keys:
+                    self._entries.pop(key, None)
+            self._seen_version = version
+
+    def invalidate(self, key):
+        """Drop a cached value, if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_many(self, keys):
+        """Drop several cached values"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop all cached values and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def get_stats(self):
+        """Get cache counters
+
+        Returns:
+            dict: size, hits, misses, evictions
+        """
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class VersionStamp(object):
+    """A channel's shared version number, kept in the CacheVersions table
+
+    get() reads the table at most once every check_interval seconds, which
+    bounds how long another process's cache can serve a changed record.
+
+    The keys changed by the last CHANGE_LOG_SIZE bumps are kept in slots
+    ('<channel>#<version % CHANGE_LOG_SIZE>'), each recording the version
+    it belongs to, so the channel's own item stays small.
+    """
+
+    def __init__(self, channel, check_interval=10):
+        """
+        Args:
+            channel: channel name, e.g. Organization.CACHE_CHANNEL
+            check_interval: seconds between reads of the table
+        """
+        self.channel = channel
+        self.check_interval = check_interval
+        self._version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Get the current version
+
+        Returns:
+            number, or None if the table couldn't be read
+        """
+        with self._lock:
+            if self._checked_at is not None and time.time() - self._checked_at < self.check_interval:
+                return self._version
+        try:
+            item = Throttle.call(
+                VERSION_TABLE,
+                Throttle.READ,
+                1,
+                Connection.get_table(VERSION_TABLE).get_item,
+                Key={'uuid': self.channel},
+            ).get('Item', {})
+            version = item.get('version', 0)
+        except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError):
+            version = None
+        with self._lock:
+            self._version = version
+            self._checked_at = time.time()
+        return version
+
+    def get_changed_keys(self, since, version):
+        """Get the keys changed after version `since`, up to `version`
+
+        Returns:
+            set of keys, or None if they aren't known
+        """
+        if since is None or version is None or not 0 < version - since <= CHANGE_LOG_SIZE:
+            return None
+        keys = set()
+        for number in range(int(since) + 1, int(version) + 1):
+            try:
+                item = Throttle.call(
+                    VERSION_TABLE,
+                    Throttle.READ,
+                    1,
+                    Connection.get_table(VERSION_TABLE).get_item,
+                    Key={'uuid': self._get_slot(number)},
+                ).get('Item', {})
+            except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError):
+                return None
+            # The slot may not be written yet, or already be reused
+            if item.get('version') != number or 'keys' not in item:
+                return None
+            keys.update(item['keys'])
+        return keys
+
+    def bump(self, keys=None):
+        """Announce that records on the channel have changed
+
+        Failures are printed rather than raised: the records have already
+        been written, and other processes' caches still expire them.
+
+        Args:
+            keys: the changed keys; if omitted, or there are more than
+                CHANGE_LOG_MAX_KEYS, other caches drop everything
+        Returns:
+            the new version, or None if it couldn't be bumped
+        """
+        table = Connection.get_table(VERSION_TABLE)
+        try:
+            result = Throttle.call(
+                VERSION_TABLE,
+                Throttle.WRITE,
+                1,
+                table.update_item,
+                Key={'uuid': self.channel},
+                UpdateExpression='ADD #version :one',
+                ExpressionAttributeNames={'#version': 'version'},
+                ExpressionAttributeValues={':one': 1},
+                ReturnValues='UPDATED_NEW',
+            )
+            version = int(result['Attributes']['version'])
+            if keys and len(set(keys)) <= CHANGE_LOG_MAX_KEYS:
+                Throttle.call(
+                    VERSION_TABLE,
+                    Throttle.WRITE,
+                    1,
+                    table.put_item,
+                    Item={'uuid': self._get_slot(version), 'version': version, 'keys': sorted(set(keys))},
+                )
+        except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as exc:
+            print('Unable to bump the {} cache version: {}'.format(self.channel, exc))
+            return None
+        with self._lock:
+            self._version = version
+            self._checked_at = time.time()
+        return version
+
+    def _get_slot(self, version):
+        """Key of the item holding the keys changed in `version`"""
+        return '{}#{}'.format(self.channel, int(version) % CHANGE_LOG_SIZE)
+
+
+# Invalidation bus: channel name => list of callbacks taking a list of keys
+_SUBSCRIBERS = {}
+_SUBSCRIBERS_LOCK = threading.Lock()
+
+
+def subscribe(channel, callback):
+    """Call `callback(keys)` whenever keys are invalidated on the channel"""
+    with _SUBSCRIBERS_LOCK:
+        _SUBSCRIBERS.setdefault(channel, []).append(callback)
+
+
+def unsubscribe(channel, callback):
+    """Stop calling `callback` for the channel"""
+    with _SUBSCRIBERS_LOCK:
+        if callback in _SUBSCRIBERS.get(channel, []):
+            _SUBSCRIBERS[channel].remove(callback)
+
+
+def publish(channel, keys):
+    """Tell this process's subscribers that the keys have changed
+
+    Args:
+        channel: channel name, e.g. Organization.CACHE_CHANNEL
+        keys: list of changed keys
+    """
+    with _SUBSCRIBERS_LOCK:
+        callbacks = list(_SUBSCRIBERS.get(channel, []))
+    for callback in callbacks:
+        callback(keys)
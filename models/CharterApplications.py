@@ -7,7 +7,6 @@ class CharterApplications(Base.Object):
 
     def __init__(self):
         super(self.__class__, self).__init__()
-        self.uuid = self.get_uuid()
         self.sponsoring_organization_uuid = ''
         self.year = 0
         self.status = ''
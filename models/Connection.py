@@ -0,0 +1,135 @@
+"""DynamoDB connection pool
+
+Creating a boto3 session, resource, and Table on every Persister is slow,
+and Lambda containers are reused between invocations.  This module keeps one
+lazily-initialized resource, client, and Table per table name for the life
+of the process, so warm invocations skip the setup entirely.
+
+Settings can be supplied through environment variables (useful for Lambda)
+or by calling configure() before the first Persister is created.
+"""
+import os
+import threading
+
+import boto3
+import boto3.dynamodb.types
+import botocore.config
+
+_SETTINGS = {
+    'region_name': os.environ.get('DYNAMODB_REGION'),
+    'endpoint_url': os.environ.get('DYNAMODB_ENDPOINT_URL'),
+    'max_pool_connections': int(os.environ.get('DYNAMODB_MAX_POOL_CONNECTIONS', 50)),
+    'connect_timeout': int(os.environ.get('DYNAMODB_CONNECT_TIMEOUT', 5)),
+    'read_timeout': int(os.environ.get('DYNAMODB_READ_TIMEOUT', 10)),
+    'tcp_keepalive': os.environ.get('DYNAMODB_TCP_KEEPALIVE', '1') == '1',
+}
+
+_LOCK = threading.Lock()
+_RESOURCE = None
+_CLIENT = None
+_TABLES = {}
+
+_SERIALIZER = boto3.dynamodb.types.TypeSerializer()
+_DESERIALIZER = boto3.dynamodb.types.TypeDeserializer()
+
+
+def configure(**settings):
+    """Change connection settings
+
+    Any existing connections are discarded, so this should be called before
+    the first Persister is created.
+
+    Args:
+        region_name: AWS region
+        endpoint_url: override for local DynamoDB
+        max_pool_connections: size of the botocore HTTP connection pool
+        connect_timeout: seconds
+        read_timeout: seconds
+        tcp_keepalive: boolean; keep idle pooled connections alive
+    """
+    for key in settings:
+        if key not in _SETTINGS:
+            raise Exception('Unknown connection setting "{}"'.format(key))
+    _SETTINGS.update(settings)
+    reset()
+
+
+def reset():
+    """Drop all pooled connections and Table objects"""
+    global _RESOURCE, _CLIENT  # pylint: disable=global-statement
+    with _LOCK:
+        _RESOURCE = None
+        _CLIENT = None
+        _TABLES.clear()
+
+
+def get_resource():
+    """Get the shared DynamoDB service resource"""
+    global _RESOURCE  # pylint: disable=global-statement
+    if _RESOURCE is None:
+        with _LOCK:
+            if _RESOURCE is None:
+                _RESOURCE = boto3.resource('dynamodb', **_get_connection_args())
+    return _RESOURCE
+
+
+def get_client():
+    """Get the shared low-level DynamoDB client
+
+    The client shares the resource's HTTP connection pool.
+    """
+    global _CLIENT  # pylint: disable=global-statement
+    if _CLIENT is None:
+        _CLIENT = get_resource().meta.client
+    return _CLIENT
+
+
+def get_table(table_name):
+    """Get the shared Table object for the specified table"""
+    table = _TABLES.get(table_name)
+    if table is None:
+        resource = get_resource()
+        with _LOCK:
+            table = _TABLES.get(table_name)
+            if table is None:
+                table = resource.Table(table_name)
+                _TABLES[table_name] = table
+    return table
+
+
+def serialize(data):
+    """Convert a dict of plain values to the client's typed attribute values
+
+    Table objects do this themselves; calls made with the low-level client
+    (transactions, threaded scans) need it done for them.
+    """
+    return dict([(key, _SERIALIZER.serialize(val)) for key, val in data.items()])
+
+
+def deserialize(data):
+    """Convert a dict of typed attribute values from the client to plain values"""
+    return dict([(key, _DESERIALIZER.deserialize(val)) for key, val in data.items()])
+
+
+def _get_connection_args():
+    """Build the keyword arguments for boto3.resource()"""
+    config_args = {
+        'max_pool_connections': _SETTINGS['max_pool_connections'],
+        'connect_timeout': _SETTINGS['connect_timeout'],
+        'read_timeout': _SETTINGS['read_timeout'],
+    }
+    if _SETTINGS['tcp_keepalive']:
+        config_args['tcp_keepalive'] = True
+    try:
+        config = botocore.config.Config(**config_args)
+    except TypeError:
+        # Older botocore releases don't support tcp_keepalive
+        config_args.pop('tcp_keepalive', None)
+        config = botocore.config.Config(**config_args)
+
+    args = {'config': config}
+    if _SETTINGS['region_name']:
+        args['region_name'] = _SETTINGS['region_name']
+    if _SETTINGS['endpoint_url']:
+        args['endpoint_url'] = _SETTINGS['endpoint_url']
+    return args
@@ -21,7 +21,7 @@ class District(Organization.Object):
         return 'dst'
 
 
-class Validator(Base.Validator):
+class Validator(Organization.Validator):
     """District validator"""
 
     def get_field_requirements(self):
@@ -63,7 +63,7 @@ class Factory(Base.Factory):
         return obj
 
 
-class Persister(Base.Persister):
+class Persister(Organization.Persister):
     """Persists District objects"""
 
     @staticmethod
@@ -7,7 +7,6 @@ class Guardian(Base.Object):
 
     def __init__(self):
         super(self.__class__, self).__init__()
-        self.uuid = self.get_uuid()
         self.user_uuid = ''
         self.first_name = ''
         self.last_name = ''
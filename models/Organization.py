@@ -1,19 +1,71 @@
 """Organization classes"""
+import contextlib
+import os
+import threading
+
 from . import Base
+from . import Cache
 
 ORG_TYPE_DISTRICT = 'District'
 ORG_TYPE_SUBDISTRICT = 'Subdistrict'
 ORG_TYPE_SPONSORING_ORGANIZATION = 'Sponsoring Organization'
 ORG_TYPE_UNIT = 'Unit'
 
+# Organization records by uuid.  The hierarchy only changes when the council
+# import runs, so nearly all reads are repeats.  A size of 0 disables it.
+# Writes bump the channel's version stamp, which every process checks every
+# ORGANIZATION_CACHE_VERSION_CHECK seconds (0 to not share invalidations);
+# bulk writers defer the bump with deferred_invalidation().
+CACHE_CHANNEL = 'organization'
+CACHE_VERSION_CHECK_SECONDS = int(os.environ.get('ORGANIZATION_CACHE_VERSION_CHECK', 10))
+CACHE = Cache.LRUCache(
+    max_size=int(os.environ.get('ORGANIZATION_CACHE_SIZE', 1000)),
+    ttl=int(os.environ.get('ORGANIZATION_CACHE_TTL', 300)),
+    version=Cache.VersionStamp(CACHE_CHANNEL, CACHE_VERSION_CHECK_SECONDS) if CACHE_VERSION_CHECK_SECONDS else None,
+)
+Cache.subscribe(CACHE_CHANNEL, CACHE.invalidate_many)
+
+_DEFERRED = threading.local()
+
+
+def announce_changes(uuids):
+    """Tell other processes' caches that organizations have changed"""
+    if uuids and CACHE.version:
+        CACHE.version.bump(uuids)
+
+
+@contextlib.contextmanager
+def deferred_invalidation():
+    """Announce the organizations written in the block once, when it ends
+
+    Used by the import, so a message or file costs one version stamp bump
+    rather than one per write.  This process's cache is still invalidated
+    as each write happens.
+    """
+    if getattr(_DEFERRED, 'uuids', None) is not None:
+        # Already deferred by an outer block
+        yield
+        return
+    _DEFERRED.uuids = []
+    try:
+        yield
+    finally:
+        uuids = _DEFERRED.uuids
+        _DEFERRED.uuids = None
+        announce_changes(uuids)
+
 
 class Object(Base.Object):
-    """Base Organization class"""
+    """Base Organization class
+
+    The uuid is derived from the number and parent_uuid.  It's computed the
+    first time it's needed and recomputed only if either of those changes.
+    """
 
     def __init__(self):
         super(Object, self).__init__()
         self.name = ''
-        self.parent_uuid = ''
+        self._parent_uuid = ''
         self._number = None
         self._uuid = None
 
@@ -26,20 +78,35 @@ class Object(Base.Object):
     def number(self, value):
         """number property"""
         if not self._number or value == self._number:
+            if value != self._number:
+                self._uuid = None
             self._number = value
         else:
             raise Exception('Number cannot be changed once set')
 
+    @property
+    def parent_uuid(self):
+        """parent_uuid property"""
+        return self._parent_uuid
+
+    @parent_uuid.setter
+    def parent_uuid(self, value):
+        """parent_uuid property"""
+        if value != self._parent_uuid:
+            self._uuid = None
+        self._parent_uuid = value
+
     @property
     def uuid(self):
         """uuid property"""
-        self._uuid = self.get_uuid()
+        if self._uuid is None:
+            self._uuid = self.get_uuid()
         return self._uuid
 
     def to_dict(self):
         """Converts object to dict"""
         data = super(Object, self).to_dict()
-        data['uuid'] = self.get_uuid()
+        data['uuid'] = self.uuid
         return data
 
     def get_uuid(self):
@@ -53,13 +120,78 @@ class Object(Base.Object):
         )
 
 
+def precompute_uuids(parent_uuid, levels):
+    """Compute the uuids of a line of organizations in one pass
+
+    Each organization is the parent of the next, so each uuid is built on
+    the one before it, without constructing any objects.
+
+    Args:
+        parent_uuid: parent_uuid of the first organization
+        levels: list of (uuid prefix, number), parents first
+    Returns:
+        list of uuids, '' for an organization without a number
+    """
+    uuids = []
+    for (prefix, number) in levels:
+        uuid = '{}-{}.{}'.format(prefix, number, parent_uuid) if number else ''
+        uuids.append(uuid)
+        parent_uuid = uuid
+    return uuids
+
+
 class Validator(Base.Validator):
     """Base validator for Organizations"""
-    pass
+
+    def get_derived_fields(self):
+        return {'uuid': self.obj.get_uuid()}
+
+    def prepare_for_validate(self):
+        # Organization objects derive their own uuid
+        pass
 
 
 class Persister(Base.Persister):
-    """Persists Unit objects"""
+    """Persists Organization objects
+
+    Reads by uuid go through CACHE, and writes invalidate it.
+    """
+
+    def get(self, key):
+        """Load from cache or DB by primary key"""
+        if set(key) != set(['uuid']):
+            return super(Persister, self).get(key)
+        item = CACHE.get(key['uuid'])
+        if item is None:
+            item = super(Persister, self).get(key)
+            CACHE.set(key['uuid'], item)
+        return item
+
+    def get_many(self, keys):
+        """Load multiple records from cache or DB by primary key"""
+        items = []
+        missing_keys = []
+        for key in keys:
+            item = CACHE.get(key['uuid'])
+            if item is None:
+                missing_keys.append(key)
+            else:
+                items.append(item)
+        if missing_keys:
+            for item in super(Persister, self).get_many(missing_keys):
+                CACHE.set(item['uuid'], item)
+                items.append(item)
+        return items
+
+    def after_write(self, objs):
+        """Drop written records from this process's caches, and tell the others"""
+        uuids = [obj.uuid for obj in objs]
+        Cache.publish(CACHE_CHANNEL, uuids)
+        pending = getattr(_DEFERRED, 'uuids', None)
+        if pending is not None:
+            pending.extend(uuids)
+        else:
+            announce_changes(uuids)
 
     @staticmethod
     def _get_table_name():
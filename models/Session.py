@@ -13,7 +13,6 @@ class Session(Base.Object):
 
     def __init__(self, user_uuid=None):
         super(self.__class__, self).__init__()
-        self.uuid = self.get_uuid()
         self.user_uuid = user_uuid
         self.expires = datetime.now() + timedelta(seconds=self.EXPIRES_AFTER_SECONDS)
         self.data = {}
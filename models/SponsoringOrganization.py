@@ -20,7 +20,7 @@ class SponsoringOrganization(Organization.Object):
         return 'spo'
 
 
-class Validator(Base.Validator):
+class Validator(Organization.Validator):
     """SponsoringOrganization validator"""
 
     def get_field_requirements(self):
@@ -64,7 +64,7 @@ class Factory(Base.Factory):
         return obj
 
 
-class Persister(Base.Persister):
+class Persister(Organization.Persister):
     """Persists SponsoringOrganization objects"""
 
     @staticmethod
@@ -20,7 +20,7 @@ class Subdistrict(Organization.Object):
         return 'sbd'
 
 
-class Validator(Base.Validator):
+class Validator(Organization.Validator):
     """Subdistrict Validator"""
 
     def get_field_requirements(self):
@@ -64,7 +64,7 @@ class Factory(Base.Factory):
         return obj
 
 
-class Persister(Base.Persister):
+class Persister(Organization.Persister):
     """Persists Subdistrict objects"""
 
     @staticmethod
@@ -0,0 +1,50 @@
+"""DynamoDB table definitions
+
+Key schemas for the tables and global secondary indexes created by
+aws/project_init.py.  The query planner in Base.Persister uses these to
+decide which index can answer a search.  Keep the two in sync.
+"""
+
+PRIMARY_KEY = 'uuid'
+
+# Index projections
+KEYS_ONLY = 'KEYS_ONLY'
+ALL = 'ALL'
+
+# table name => list of (index name, hash key, range key or None, projection)
+INDEXES = {
+    'Users': [
+        ('username', 'username', 'password', KEYS_ONLY),
+        ('session_uuid', 'session_uuid', None, KEYS_ONLY),
+    ],
+    'People': [
+        ('duplicate_hash', 'duplicate_hash', None, KEYS_ONLY),
+        ('scoutnet_id', 'scoutnet_id', None, KEYS_ONLY),
+        ('organization_uuid', 'organization_uuid', None, KEYS_ONLY),
+        ('user_uuid', 'user_uuid', None, KEYS_ONLY),
+    ],
+    'Volunteers': [
+        ('duplicate_hash', 'duplicate_hash', None, KEYS_ONLY),
+        ('scoutnet_id', 'scoutnet_id', None, KEYS_ONLY),
+        ('unit_uuid', 'unit_uuid', None, KEYS_ONLY),
+    ],
+    'Organizations': [
+        ('parent_uuid', 'parent_uuid', None, KEYS_ONLY),
+        ('number', 'number', 'type', KEYS_ONLY),
+    ],
+    'Applications': [
+        ('status', 'status', None, KEYS_ONLY),
+        ('organization_uuid', 'organization_uuid', None, KEYS_ONLY),
+    ],
+    'RecordLogs': [],
+    'Sessions': [
+        ('user_uuid', 'user_uuid', None, KEYS_ONLY),
+    ],
+    'RevokedTokens': [],
+    'CacheVersions': [],
+}
+
+
+def get_indexes(table_name):
+    """Get the global secondary indexes defined for the table"""
+    return INDEXES.get(table_name, [])
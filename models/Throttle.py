@@ -0,0 +1,212 @@
+"""DynamoDB throttling: retries, backoff, and client-side rate limiting
+
+Every Persister call to DynamoDB goes through call(), which:
+
+    * waits on the table's token bucket, if a rate limit has been set for it
+    * retries throttling errors (ProvisionedThroughputExceededException etc.)
+      with jittered exponential backoff
+    * records retries and time spent throttled or rate limited
+
+Rate limits are opt-in.  A bulk job (organization import, sample data
+seeding) calls limit_table() to hold itself to a percentage of the table's
+provisioned capacity, leaving the rest for interactive requests, which only
+get the retries.
+
+Buckets live in the process.  A job spread over several processes (Lambda
+containers) passes the number of them as `workers`, and each takes an equal
+share of the budget; nothing is coordinated between processes, so the count
+must be an upper bound, such as the function's reserved concurrency.
+"""
+import random
+import threading
+import time
+
+import botocore.exceptions
+
+from . import Connection
+
+READ = 'read'
+WRITE = 'write'
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_MAX_SECONDS = 5
+
+THROTTLING_ERROR_CODES = [
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+]
+
+_BUCKETS = {}
+_METRICS = {}
+_LOCK = threading.Lock()
+
+
+def get_backoff_seconds(attempt):
+    """Exponential backoff with full jitter for retry number `attempt`"""
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket
+
+    Tokens are capacity units; the bucket refills at `rate` units per second
+    and holds at most `burst` units.  A request larger than the bucket holds
+    (a 25-item batch write against a 1 WCU limit, say) takes all of its
+    units anyway and puts the bucket into debt, which it and later callers
+    wait out.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def consume(self, units=1):
+        """Take `units` tokens, sleeping until the bucket is out of debt
+
+        Returns:
+            float: seconds spent waiting
+        """
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens = self._tokens - float(units)
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+def limit_table(table_name, percent, read_capacity=None, write_capacity=None, workers=1):
+    """Hold this process to its share of a percentage of a table's capacity
+
+    Args:
+        table_name: DynamoDB table name
+        percent: percentage (1-100) of provisioned capacity the job may use
+        read_capacity: provisioned RCUs; looked up from the table if omitted
+        write_capacity: provisioned WCUs; looked up from the table if omitted
+        workers: most processes running the job at once; each gets
+            1/workers of the budget
+    """
+    if read_capacity is None or write_capacity is None:
+        throughput = Connection.get_table(table_name).provisioned_throughput or {}
+        if read_capacity is None:
+            read_capacity = throughput.get('ReadCapacityUnits', 0)
+        if write_capacity is None:
+            write_capacity = throughput.get('WriteCapacityUnits', 0)
+
+    with _LOCK:
+        for (kind, capacity) in ((READ, read_capacity), (WRITE, write_capacity)):
+            rate = capacity * percent / 100.0 / max(1, workers)
+            if rate > 0:
+                _BUCKETS[(table_name, kind)] = TokenBucket(rate)
+            else:
+                # On-demand tables report no provisioned capacity
+                _BUCKETS.pop((table_name, kind), None)
+
+
+def unlimit_table(table_name):
+    """Remove any rate limit on the table"""
+    with _LOCK:
+        _BUCKETS.pop((table_name, READ), None)
+        _BUCKETS.pop((table_name, WRITE), None)
+
+
+def acquire(table_name, kind, units):
+    """Wait for the table's rate limit, if it has one
+
+    Args:
+        table_name: DynamoDB table name
+        kind: READ or WRITE
+        units: approximate capacity units about to be consumed
+    """
+    bucket = _BUCKETS.get((table_name, kind))
+    if bucket:
+        _record(table_name, 'rate_limited_seconds', bucket.consume(units))
+
+
+def call(table_name, kind, units, func, *args, **kwargs):
+    """Call DynamoDB, applying the table's rate limit and retrying throttling
+
+    Args:
+        table_name: table the call uses (for rate limits & metrics)
+        kind: READ or WRITE
+        units: approximate capacity units the call consumes
+        func: boto3 method to call
+    Returns:
+        whatever func returns
+    """
+    acquire(table_name, kind, units)
+
+    attempt = 0
+    while True:
+        try:
+            result = func(*args, **kwargs)
+            _settle(table_name, kind, units, result)
+            return result
+        except botocore.exceptions.ClientError as exc:
+            if exc.response['Error']['Code'] not in THROTTLING_ERROR_CODES:
+                raise
+            attempt = attempt + 1
+            if attempt >= MAX_ATTEMPTS:
+                _record(table_name, 'throttling_failures', 1)
+                raise
+            delay = get_backoff_seconds(attempt)
+            _record(table_name, 'retries', 1)
+            _record(table_name, 'throttled_seconds', delay)
+            time.sleep(delay)
+
+
+def _settle(table_name, kind, units, result):
+    """Charge the rate limit for capacity used beyond the estimate
+
+    Reads of unknown size (query and scan pages) are estimated at 1 unit and
+    request ReturnConsumedCapacity; the rest of what they used is charged
+    once DynamoDB reports it.
+    """
+    consumed = result.get('ConsumedCapacity') if isinstance(result, dict) else None
+    if isinstance(consumed, dict) and consumed.get('CapacityUnits', 0) > units:
+        acquire(table_name, kind, float(consumed['CapacityUnits']) - units)
+
+
+def record_retry(table_name, delay):
+    """Record a retry the caller handled itself (e.g. unprocessed batch items)"""
+    _record(table_name, 'retries', 1)
+    _record(table_name, 'throttled_seconds', delay)
+
+
+def _record(table_name, metric, value):
+    """Add to a metric"""
+    if not value:
+        return
+    with _LOCK:
+        metrics = _METRICS.setdefault(table_name, {
+            'retries': 0,
+            'throttling_failures': 0,
+            'throttled_seconds': 0.0,
+            'rate_limited_seconds': 0.0,
+        })
+        metrics[metric] = metrics[metric] + value
+
+
+def get_metrics():
+    """Get throttling metrics by table
+
+    Returns:
+        dict: table name => dict of retries, throttling_failures,
+            throttled_seconds, rate_limited_seconds
+    """
+    with _LOCK:
+        return dict([(table_name, dict(metrics)) for table_name, metrics in _METRICS.items()])
+
+
+def reset_metrics():
+    """Clear throttling metrics"""
+    with _LOCK:
+        _METRICS.clear()
@@ -0,0 +1,180 @@
+"""Signed session tokens
+
+An alternative to server-side sessions.  A token carries the user's uuid and
+roles and is signed with HMAC-SHA256, so it can be verified without reading
+anything from DynamoDB:
+
+    token = Token.issue(user)
+    user = Token.get_user(token)
+
+Tokens expire on their own.  Logging out adds the token to the RevokedTokens
+table; each process keeps a copy of that (small) list and refreshes it every
+REVOCATION_REFRESH_SECONDS.
+
+Token mode is enabled by setting SESSION_TOKEN_SECRET.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+
+from . import AuthenticationFailureException
+from . import Base
+from . import User
+
+SECRET = os.environ.get('SESSION_TOKEN_SECRET', '')
+EXPIRES_AFTER_SECONDS = int(os.environ.get('SESSION_TOKEN_TTL', 3600))
+REVOCATION_REFRESH_SECONDS = 60
+
+_revoked = set()
+_revoked_loaded_at = None
+_revoked_lock = threading.Lock()
+
+
+def is_enabled():
+    """Whether token sessions are configured"""
+    return bool(SECRET)
+
+
+def issue(user, expires_after=None):
+    """Create a signed token for the user
+
+    Args:
+        user: User object
+        expires_after: seconds the token is valid; defaults to
+            EXPIRES_AFTER_SECONDS
+    Returns:
+        str
+    """
+    payload = {
+        'uuid': Revocation().get_uuid(),
+        'user_uuid': user.uuid,
+        'roles': user.roles,
+        'expires': int(time.time()) + (expires_after or EXPIRES_AFTER_SECONDS),
+    }
+    body = _encode(json.dumps(payload, sort_keys=True))
+    return '{}.{}'.format(body, _sign(body))
+
+
+def verify(token):
+    """Check the token's signature, expiry, and revocation
+
+    Returns:
+        dict: the token payload
+    Raises:
+        AuthenticationFailureException
+    """
+    if not is_enabled():
+        raise AuthenticationFailureException('Authentication failure.')
+    try:
+        (body, signature) = str(token).split('.')
+        valid_signature = hmac.compare_digest(_sign(body), signature)
+        payload = json.loads(_decode(body)) if valid_signature else None
+    except (TypeError, ValueError):
+        payload = None
+    if not payload or payload['expires'] < time.time():
+        raise AuthenticationFailureException('Authentication failure.')
+    if is_revoked(payload['uuid']):
+        raise AuthenticationFailureException('Session has ended.')
+    return payload
+
+
+def get_user(token):
+    """Get the (partial) user the token was issued to
+
+    Only the uuid and roles are known; the user must be loaded for anything
+    else.
+    """
+    payload = verify(token)
+    return User.Factory().construct_partial({
+        'uuid': payload['user_uuid'],
+        'roles': payload['roles'],
+    })
+
+
+def revoke(token):
+    """End the token's session before it expires"""
+    payload = verify(token)
+    revocation = Revocation()
+    revocation.uuid = payload['uuid']
+    revocation.expires = payload['expires']
+    Persister().save(revocation)
+    with _revoked_lock:
+        _revoked.add(revocation.uuid)
+
+
+def is_revoked(token_uuid):
+    """Check the process's copy of the revocation list, refreshing if stale"""
+    global _revoked, _revoked_loaded_at  # pylint: disable=global-statement,invalid-name
+    with _revoked_lock:
+        if _revoked_loaded_at is None or time.time() - _revoked_loaded_at > REVOCATION_REFRESH_SECONDS:
+            _revoked = set([item['uuid'] for item in Persister().scan()])
+            _revoked_loaded_at = time.time()
+        return token_uuid in _revoked
+
+
+def _sign(body):
+    digest = hmac.new(SECRET.encode('utf-8'), body.encode('utf-8'), hashlib.sha256).digest()
+    return _encode(digest)
+
+
+def _encode(data):
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    return str(base64.urlsafe_b64encode(data).decode('ascii').rstrip('='))
+
+
+def _decode(data):
+    return base64.urlsafe_b64decode(str(data) + '=' * (-len(data) % 4)).decode('utf-8')
+
+
+class Revocation(Base.Object):
+    """Revoked token
+
+    Stored until the token would have expired anyway; the table's TTL
+    attribute is 'expires'.
+    """
+
+    def __init__(self):
+        super(self.__class__, self).__init__()
+        self.expires = 0
+
+    def get_validator(self):
+        return Validator(self)
+
+    @staticmethod
+    def get_uuid_prefix():
+        return 'tok'
+
+
+class Validator(Base.Validator):
+    """Revocation validator"""
+
+    def get_field_requirements(self):
+        return {
+            'uuid': Base.FIELD_REQUIRED,
+            'expires': Base.FIELD_REQUIRED,
+        }
+
+
+class Factory(Base.Factory):
+    """Revocation Factory"""
+
+    @staticmethod
+    def _get_object_class():
+        return Revocation
+
+    @staticmethod
+    def get_persister():
+        return Persister()
+
+
+class Persister(Base.Persister):
+    """Persists Revocation objects"""
+
+    @staticmethod
+    def _get_table_name():
+        return 'RevokedTokens'
@@ -0,0 +1,123 @@
+"""Multi-item transactions
+
+Commits puts, updates, and condition checks across the Applications, People,
+and Organizations tables (or any others) in a single TransactWriteItems call,
+so related records are written in one round trip and never partially.
+"""
+import botocore.exceptions
+
+from . import ConditionFailedException
+from . import Connection
+from . import Throttle
+
+MAX_ITEMS = 100
+
+# Metrics key for throttling of transactions, which span tables
+METRICS_NAME = 'TransactWriteItems'
+
+
+class Transaction(object):
+    """Writes across tables that all succeed or all fail
+
+    Puts, field-level updates, and condition checks are collected and then
+    sent in a single TransactWriteItems call:
+
+        transaction = Transaction.Transaction()
+        transaction.save(Youth.ApplicationPersister(), app, {'status': from_status})
+        transaction.save(Youth.YouthPersister(), youth)
+        transaction.commit()
+    """
+
+    def __init__(self):
+        self.items = []
+        self._objs = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def save(self, persister, obj, expected=None):
+        """Add a put or update of the object, as Persister.save would write it
+
+        Unchanged objects are skipped.
+        """
+        write = persister.get_write(obj, expected)
+        if write:
+            (operation, write_args) = write
+            item = dict(write_args, TableName=persister._get_table_name())  # pylint: disable=protected-access
+            if operation == 'put_item':
+                self._add({'Put': item})
+            else:
+                self._add({'Update': item})
+        self._objs.append((obj, persister))
+
+    def condition_check(self, persister, uuid, expected):
+        """Require another record to match without writing it
+
+        Args:
+            persister: Persister for the record's table
+            uuid: primary key value
+            expected: dict of field => value the record must have
+        """
+        item = persister.get_condition_args(expected)
+        item.update({
+            'TableName': persister._get_table_name(),  # pylint: disable=protected-access
+            'Key': {'uuid': uuid},
+        })
+        self._add({'ConditionCheck': item})
+
+    def _add(self, item):
+        if len(self.items) >= MAX_ITEMS:
+            raise Exception('Transactions are limited to {} items'.format(MAX_ITEMS))
+        self.items.append(item)
+
+    def _get_write_units(self):
+        """Capacity units by table; transactional writes cost double"""
+        units = {}
+        for item in self.items:
+            table_name = item.values()[0]['TableName']
+            units[table_name] = units.get(table_name, 0) + 2
+        return units
+
+    @staticmethod
+    def _get_client_item(item):
+        """Convert an item's values to the client's typed attribute values
+
+        The items are built from Table-style write arguments, with plain
+        Python values; TransactWriteItems is only available on the client.
+        """
+        (operation, args) = item.items()[0]
+        args = dict(args)
+        for key in ('Item', 'Key', 'ExpressionAttributeValues'):
+            if key in args:
+                args[key] = Connection.serialize(args[key])
+        return {operation: args}
+
+    def commit(self):
+        """Write everything in one round trip
+
+        Raises:
+            ConditionFailedException: a condition failed, so nothing was written
+        """
+        if self.items:
+            try:
+                for (table_name, units) in self._get_write_units().items():
+                    Throttle.acquire(table_name, Throttle.WRITE, units)
+                Throttle.call(
+                    METRICS_NAME,
+                    Throttle.WRITE,
+                    0,
+                    Connection.get_client().transact_write_items,
+                    TransactItems=[self._get_client_item(item) for item in self.items]
+                )
+            except botocore.exceptions.ClientError as exc:
+                if exc.response['Error']['Code'] != 'TransactionCanceledException':
+                    raise
+                reasons = [reason.get('Code') for reason in exc.response.get('CancellationReasons', [])]
+                if 'ConditionalCheckFailed' in reasons or 'ConditionalCheckFailed' in str(exc):
+                    raise ConditionFailedException('Records have changed; transaction cancelled')
+                raise
+        for (obj, persister) in self._objs:
+            obj.mark_clean()
+            persister.after_write([obj])
+        self.items = []
+        self._objs = []
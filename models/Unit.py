@@ -74,7 +74,7 @@ class Factory(Base.Factory):
         return Persister()
 
 
-class Persister(Base.Persister):
+class Persister(Organization.Persister):
     """Persists Unit objects"""
 
     @staticmethod
@@ -0,0 +1,124 @@
+"""Request-scoped unit of work
+
+A unit of work keeps an identity map of the objects loaded during a request,
+so each record is read at most once, and collects the objects to be written
+so they can all be flushed together when the request is done.
+
+Factories consult the current unit of work automatically.  A Lambda facade
+starts one for the duration of the request:
+
+    with UnitOfWork.UnitOfWork() as work:
+        app = Youth.ApplicationFactory().load_by_uuid(uuid)
+        ...
+        work.register(app, Youth.ApplicationPersister())
+
+Writes are flushed when the block exits without an exception.
+"""
+
+from . import Transaction
+
+_CURRENT = None
+
+
+def get_current():
+    """Get the active unit of work, if any"""
+    return _CURRENT
+
+
+class UnitOfWork(object):
+    """Identity map plus pending writes for one request"""
+
+    def __init__(self):
+        self._identity_map = {}
+        self._registered = []
+
+    def __enter__(self):
+        global _CURRENT  # pylint: disable=global-statement
+        if _CURRENT is not None:
+            raise Exception('SYSTEM ERROR: a unit of work is already active.')
+        _CURRENT = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _CURRENT  # pylint: disable=global-statement
+        _CURRENT = None
+        if exc_type is None:
+            self.commit()
+
+    def get(self, klass, uuid):
+        """Get an already-loaded object, or None"""
+        entry = self._identity_map.get((klass, uuid))
+        if entry:
+            return entry[0]
+        return None
+
+    def add(self, obj, persister):
+        """Add a loaded object to the identity map
+
+        Loaded objects that have been changed are written at commit.
+        """
+        self._identity_map[(obj.__class__, obj.uuid)] = (obj, persister)
+
+    def register(self, obj, persister, expected=None):
+        """Schedule an object to be written at commit
+
+        Args:
+            obj: new or loaded object
+            persister: Persister to write it with
+            expected: optional dict of field => value the stored record must
+                still have (see Persister.save)
+        """
+        self._registered = [entry for entry in self._registered if entry[0] is not obj]
+        self._registered.append((obj, persister, expected))
+
+    def get_pending_writes(self):
+        """List the objects that need to be written
+
+        Returns:
+            list of (object, persister, expected) tuples
+        """
+        writes = list(self._registered)
+        registered = [entry[0] for entry in writes]
+        for (obj, persister) in self._identity_map.values():
+            if obj not in registered and obj.get_changes():
+                writes.append((obj, persister, None))
+        return [entry for entry in writes if entry[0].get_changes() != {}]
+
+    def commit(self):
+        """Write all new and changed objects
+
+        A single write is saved on its own, since transactional writes cost
+        twice the capacity.  Several writes go in a single transaction when
+        they fit; otherwise new objects are grouped by table into batch
+        writes and changed objects are written as field-level updates.
+        """
+        writes = self.get_pending_writes()
+        if len(writes) == 1:
+            (obj, persister, expected) = writes[0]
+            persister.save(obj, expected)
+            self._registered = []
+            return
+        if 1 < len(writes) <= Transaction.MAX_ITEMS:
+            transaction = Transaction.Transaction()
+            for (obj, persister, expected) in writes:
+                transaction.save(persister, obj, expected)
+            transaction.commit()
+            self._registered = []
+            return
+
+        batches = {}
+        for (obj, persister, expected) in writes:
+            changes = obj.get_changes()
+            if expected is None and (changes is None or 'uuid' in changes):
+                table_name = persister._get_table_name()  # pylint: disable=protected-access
+                batches.setdefault(table_name, (persister, []))[1].append(obj)
+            else:
+                persister.save(obj, expected)
+
+        for (persister, objs) in batches.values():
+            result = persister.save_many(objs)
+            if result['failed']:
+                raise Exception('Unable to save: {}'.format(
+                    ', '.join(['{} ({})'.format(obj.uuid, error) for obj, error in result['failed']])
+                ))
+        self._registered = []
@@ -11,7 +11,6 @@ class User(Base.Object):  # pylint: disable=too-many-instance-attributes
 
     def __init__(self):
         super(self.__class__, self).__init__()
-        self.uuid = self.get_uuid()
         self.first_name = ''
         self.last_name = ''
         self.username = ''
@@ -60,8 +59,8 @@ class Factory(Base.Factory):
         }
         data = self.get_persister().query(search)
         if len(data) == 1:
-            user = self.construct(data[0])
-            return user
+            # The index only projects keys; load the whole record
+            return self.load_by_uuid(data[0]['uuid'])
         elif len(data) > 1:  # This should never happen.
             raise MultipleMatchException('System Error 5001.')
         else:
@@ -76,8 +75,8 @@ class Factory(Base.Factory):
         }
         data = self.get_persister().query(search)
         if len(data) == 1:
-            user = self.construct(data[0])
-            return user
+            # The index only projects keys; load the whole record
+            return self.load_by_uuid(data[0]['uuid'])
         elif len(data) > 1:  # This should never happen.
             raise MultipleMatchException('System Error 5002.')
         else:
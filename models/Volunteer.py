@@ -11,7 +11,6 @@ class Volunteer(Base.Object):  # pylint: disable=too-many-instance-attributes
 
     def __init__(self):
         super(self.__class__, self).__init__()
-        self.uuid = self.get_uuid()
         self.user_uuid = ''
         self.duplicate_hash = ''
         self.unit_uuid = ''
@@ -40,8 +39,8 @@ class Volunteer(Base.Object):  # pylint: disable=too-many-instance-attributes
 class Validator(Base.Validator):
     """Volunteer validator"""
 
-    def prepare_for_validate(self):
-        self.obj.duplicate_hash = self.obj.get_record_hash()
+    def get_derived_fields(self):
+        return {'duplicate_hash': self.obj.get_record_hash()}
 
     def get_field_requirements(self):
         return {
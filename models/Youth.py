@@ -19,7 +19,6 @@ class Youth(Base.Object):  # pylint: disable=too-many-instance-attributes
 
     def __init__(self):
         super(self.__class__, self).__init__()
-        self.uuid = self.get_uuid()
         self.user_uuid = ''
         self.duplicate_hash = ''
         self.units = []
@@ -62,8 +61,8 @@ class Youth(Base.Object):  # pylint: disable=too-many-instance-attributes
 class YouthValidator(Base.Validator):
     """Youth validator"""
 
-    def prepare_for_validate(self):
-        self.obj.duplicate_hash = self.obj.get_record_hash()
+    def get_derived_fields(self):
+        return {'duplicate_hash': self.obj.get_record_hash()}
 
     def get_field_requirements(self):
         return {
@@ -113,7 +112,6 @@ class Application(Base.Object):  # pylint: disable=too-many-instance-attributes
 
     def __init__(self):
         super(self.__class__, self).__init__()
-        self.uuid = self.get_uuid()
         self.unit_uuid = ''
         self.status = APPLICATION_STATUS_CREATED
         self.guardian_approval_guardian_uuid = ''
@@ -158,6 +156,9 @@ class ApplicationValidator(Base.Validator):
         field_requirements.update(status_field_requirements)
         return field_requirements
 
+    def get_requirements_key(self):
+        return self.obj.status
+
     @staticmethod
     def get_valid_statuses():
         """List of all valid statuses"""
@@ -226,6 +227,15 @@ class ApplicationStatusValidator(object):  # pylint: disable=too-few-public-meth
 class ApplicationFactory(Base.Factory):
     """Youth Application Factory"""
 
+    def construct_for_transition(self, uuid, status):
+        """Create a partial Application for a workflow step
+
+        Steps that don't depend on the rest of the record can use this
+        instead of loading it; ApplicationPersister.save_transition() then
+        checks the status and required fields in the same write.
+        """
+        return self.construct_partial({'uuid': uuid, 'status': status})
+
     @staticmethod
     def _get_object_class():
         return Application
@@ -245,3 +255,14 @@ class ApplicationPersister(Base.Persister):
     def get_by_status(self, status):
         """Return applications matching the specified status"""
         return self.query({'status': status})
+
+    def save_transition(self, app, from_status):
+        """Save a workflow step in one conditional write
+
+        The write only succeeds if the stored application is still in
+        `from_status`, so two people can't both act on the same step.
+
+        Raises:
+            ConditionFailedException
+        """
+        self.save(app, {'status': from_status})
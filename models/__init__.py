@@ -8,6 +8,16 @@ class AuthenticationFailureException(Exception):
     pass
 
 
+class ConditionFailedException(Exception):
+    """Record did not match the expected state when written"""
+    pass
+
+
+class InvalidQueryException(Exception):
+    """Query cannot be performed as requested"""
+    pass
+
+
 class InvalidObjectException(Exception):
     """Object is not in valid state"""
     pass
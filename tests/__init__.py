@@ -20,6 +20,7 @@ class FakePersister(object):
 
     def __init__(self, data):
         self.data = data
+        self.saved = []
 
     def get(self, search_data):
         """Finds a test data record by the search_data"""
@@ -38,21 +39,54 @@ class FakePersister(object):
         else:
             raise Base.RecordNotFoundException('No record found that matches requested criteria.')
 
+    def save_many(self, objs):
+        """Records the objects as written"""
+        for obj in objs:
+            obj.get_validator().validate()
+            obj.mark_clean()
+        self.saved.extend(objs)
+        return {'succeeded': list(objs), 'failed': []}
+
+    def get_many(self, keys):
+        """Finds test data records by a list of primary keys"""
+        records = []
+        for key in keys:
+            try:
+                records.append(self.get(key))
+            except Base.RecordNotFoundException:
+                pass
+        return records
+
     def query(self, search_data):
-        """Finds test data records matching the search_data"""
+        """Finds test data records matching the search_data
+
+        Like the real (KEYS_ONLY) secondary indexes, index searches only
+        return the keys.
+        """
         records = []
-        if '__index__' in search_data:
-            del search_data['__index__']
+        index = search_data.pop('__index__', None)
         for item in self.data:
             match = True
             for field_name, field_value in search_data.items():
                 if field_name not in item or item[field_name] != field_value:
                     match = False
                     break
-            if match:
+            if match and index:
+                keys = ['uuid'] + list(search_data.keys())
+                records.append(dict([(key, item[key]) for key in keys]))
+            elif match:
                 records.append(item)
         return records
 
+    def query_page(self, search_data, page_size, cursor=None):
+        """Finds one page of test data records matching the search_data"""
+        records = self.query(search_data)
+        start = int(cursor or 0)
+        next_cursor = None
+        if start + page_size < len(records):
+            next_cursor = str(start + page_size)
+        return (records[start:start + page_size], next_cursor)
+
 
 class FakeUserFactory(User.Factory):  # pylint: disable=too-few-public-methods,no-init
     """Fake class for testing"""
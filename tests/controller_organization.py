@@ -89,6 +89,19 @@ class TestOrganizationController(unittest.TestCase):
         self.assertEqual(1, len(response))
         self.assertEqual('spo-1455.sbd-5-9.dst-5.cnl-'+COUNCIL_ID, response[0]['uuid'])
 
+    def test_search_page(self):
+        """Test 'search_page' functionality"""
+        search_data = {
+            'parent_uuid': 'dst-5.cnl-'+COUNCIL_ID,
+        }
+        response = self.controller.search_page(search_data, 1)
+        self.assertEqual(1, len(response['items']))
+        self.assertTrue(response['cursor'])
+
+        response = self.controller.search_page(search_data, 1, response['cursor'])
+        self.assertEqual(1, len(response['items']))
+        self.assertEqual(None, response['cursor'])
+
     def test_set(self):
         """Test 'set' method"""
         orig_obj = self.controller.get('unt-1455.spo-1455.sbd-5-9.dst-5.cnl-'+COUNCIL_ID)
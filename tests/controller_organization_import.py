@@ -1,18 +1,39 @@
 # pylint: disable=no-member,attribute-defined-outside-init,import-error
 """Tests OrganizationController"""
 
+import bz2
+import gzip
 import os
+import StringIO
+import time
 import unittest
 
 from controllers import ClientErrorException
 from controllers import OrganizationImport
 from models import COUNCIL_ID
+from models import Organization
 
 from . import FakeDistrictFactory
+from . import FakePersister
 from . import FakeSponsoringOrganizationFactory
 from . import FakeSubdistrictFactory
 
 
+class FailingPersister(FakePersister):
+    """Fake persister failing to write some uuids"""
+
+    def __init__(self, failing_uuids):
+        super(FailingPersister, self).__init__([])
+        self.failing_uuids = failing_uuids
+
+    def save_many(self, objs):
+        """Records the objects as written, except the failing ones"""
+        result = super(FailingPersister, self).save_many(
+            [obj for obj in objs if obj.uuid not in self.failing_uuids])
+        result['failed'] = [(obj, 'Throttled') for obj in objs if obj.uuid in self.failing_uuids]
+        return result
+
+
 class TestOrganizationImportController(unittest.TestCase):
     """Test OrganizationImportController"""
 
@@ -51,6 +72,169 @@ class TestOrganizationImportController(unittest.TestCase):
             for data in self.controller.process_file(filename):
                 pass
 
+    def test_session(self):
+        """Districts and subdistricts are resolved once per session"""
+        filename = os.path.join(os.path.dirname(__file__), 'data/orgs.tsv')
+        records = list(self.controller.process_file(filename))
+        results = [self.controller.process_record(record) for record in records]
+
+        self.assertEqual(3 + 6, self.controller.session.misses)
+        self.assertEqual(2 * len(records) - 9, self.controller.session.hits)
+        districts = [district for (district, _, _) in results if district.number == '5']
+        self.assertTrue(all(district is districts[0] for district in districts))
+
+        session = OrganizationImport.ImportSession(max_age=0)
+        time.sleep(0.01)
+        self.assertTrue(session.is_expired())
+        self.assertFalse(OrganizationImport.ImportSession().is_expired())
+
+    def test_write_plan(self):
+        """Each organization is written once, parents first"""
+        filename = os.path.join(os.path.dirname(__file__), 'data/orgs.tsv')
+        records = list(self.controller.process_file(filename))
+        uuids = set()
+        for record in records:
+            uuids.update([obj.uuid for obj in self.controller.process_record(record)])
+        plan = self.controller.plan_records(records)
+        self.assertEqual(len(uuids), len(plan))
+
+        persister = FakePersister([])
+        summary = plan.execute(persister)
+        self.assertEqual([], summary['failed'])
+        self.assertEqual(len(plan), len(summary['written']) + summary['unchanged'])
+        # Stored organizations the file doesn't change aren't rewritten
+        self.assertNotIn('dst-5.cnl-'+COUNCIL_ID, [obj.uuid for obj in persister.saved])
+        self.assertEqual(4, summary['unchanged'])
+        types = [obj.type for obj in persister.saved]
+        self.assertEqual(sorted(types, key=[
+            Organization.ORG_TYPE_DISTRICT,
+            Organization.ORG_TYPE_SUBDISTRICT,
+            Organization.ORG_TYPE_SPONSORING_ORGANIZATION,
+        ].index), types)
+        self.assertEqual(len(persister.saved), len(set([obj.uuid for obj in persister.saved])))
+
+        # One bad record doesn't stop the others
+        bad = dict(records[1], sporg_name=' ')
+        plan = self.controller.plan_records([bad] + records)
+        self.assertEqual([bad], [record for (record, _) in plan.rejected])
+        self.assertEqual(len(uuids), len(plan))
+
+        # The session's districts and subdistricts have been written since
+        summary = self.controller.plan_records(records).execute(FakePersister([]))
+        self.assertEqual(
+            set([Organization.ORG_TYPE_SPONSORING_ORGANIZATION]),
+            set([obj.type for obj in summary['written']]),
+        )
+
+    def test_write_plan_failures(self):
+        """Only the records under an organization that failed are reported"""
+        filename = os.path.join(os.path.dirname(__file__), 'data/orgs.tsv')
+        records = list(self.controller.process_file(filename))
+        persister = FailingPersister(['sbd-1-3.dst-1.cnl-'+COUNCIL_ID])
+        summary = self.controller.plan_records(records).execute(persister)
+
+        self.assertEqual(
+            ['1', '2', '5'],
+            [record['sporg_number'] for (record, _) in summary['failed_records']],
+        )
+        self.assertEqual(['Throttled'] * 3, [error for (_, error) in summary['failed_records']])
+        self.assertIn(
+            'Parent sbd-1-3.dst-1.cnl-{} not written'.format(COUNCIL_ID),
+            [error for (_, error) in summary['failed']],
+        )
+        self.assertIn('spo-1455.sbd-5-9.dst-5.cnl-'+COUNCIL_ID, [obj.uuid for obj in summary['written']])
+        self.assertNotIn('spo-1.sbd-1-3.dst-1.cnl-'+COUNCIL_ID, [obj.uuid for obj in persister.saved])
+
+    def test_diff_records(self):
+        """Only records with new or changed organizations are kept"""
+        filename = os.path.join(os.path.dirname(__file__), 'data/orgs.tsv')
+        records = list(self.controller.process_file(filename))
+        stored = []
+        for record in records:
+            stored.extend([obj.to_dict() for obj in self.controller.process_record(record)])
+        stored.append({
+            'uuid': 'spo-99.sbd-5-9.dst-5.cnl-'+COUNCIL_ID,
+            'type': Organization.ORG_TYPE_SPONSORING_ORGANIZATION,
+            'number': '99',
+            'name': 'Gone',
+            'parent_uuid': 'sbd-5-9.dst-5.cnl-'+COUNCIL_ID,
+        })
+        stored.append({
+            'uuid': 'unt-1.spo-98.sbd-5-9.dst-5.cnl-'+COUNCIL_ID,
+            'type': Organization.ORG_TYPE_UNIT,
+            'number': '1',
+            'name': 'Troop',
+            'parent_uuid': 'spo-98.sbd-5-9.dst-5.cnl-'+COUNCIL_ID,
+        })
+        stored.append(dict(stored[-2], uuid='spo-98.sbd-5-9.dst-5.cnl-'+COUNCIL_ID, number='98'))
+
+        diff = OrganizationImport.ImportDiff(stored)
+        self.assertEqual([], list(self.controller.diff_records(records, diff)))
+        self.assertEqual({'inserts': 0, 'changes': 0, 'unchanged': len(diff.fingerprints) - 3, 'deletes': 1},
+                         diff.get_summary(include_deletes=True))
+        # spo-98 still has a unit
+        deleted = self.controller.get_deleted_organizations(diff)
+        self.assertEqual(['spo-99.sbd-5-9.dst-5.cnl-'+COUNCIL_ID], [obj.uuid for obj in deleted])
+
+        # Only new organizations need processing; changes are written from the diff
+        changed = [dict(records[0], sporg_name='Renamed'), dict(records[0], sporg_number='12345')]
+        diff = OrganizationImport.ImportDiff(stored)
+        self.assertEqual(changed[1:], list(self.controller.diff_records(changed + records[1:], diff)))
+        self.assertEqual(1, len(diff.inserts))
+        self.assertEqual([{'name': 'Renamed'}], list(diff.changes.values()))
+        updates = self.controller.get_changed_organizations(diff)
+        self.assertEqual(1, len(updates))
+        self.assertEqual(list(diff.changes.keys()), [updates[0].uuid])
+        self.assertEqual({'name': 'Renamed'}, updates[0].get_changes())
+        self.assertTrue(updates[0].is_partial())
+
+    def test_skipped_rows(self):
+        """Rows missing a required column are counted"""
+        filename = os.path.join(os.path.dirname(__file__), 'data/orgs.tsv')
+        expected = list(self.controller.process_file(filename))
+        self.assertEqual(0, self.controller.skipped_rows)
+        with open(filename) as data_file:
+            lines = data_file.read().splitlines(True)
+        lines[1] = '\t'.join([''] + lines[1].split('\t')[1:])
+        records = list(self.controller.process_s3_object({'Body': StringIO.StringIO(''.join(lines))}))
+        self.assertEqual(expected[1:], records)
+        self.assertEqual(1, self.controller.skipped_rows)
+
+    def test_validate_records(self):
+        """Records are validated in batches before processing"""
+        filename = os.path.join(os.path.dirname(__file__), 'data/orgs.tsv')
+        records = list(self.controller.process_file(filename))
+        self.assertEqual({}, self.controller.validate_records(records))
+
+        records[1] = dict(records[1], subdistrict_name=' ', sporg_number='')
+        errors = self.controller.validate_records(records)
+        self.assertEqual([1], list(errors.keys()))
+        self.assertIn('Missing required field "name"', errors[1])
+        self.assertIn('Insufficient information to generate UUID', errors[1])
+
+        records[4] = dict(records[4], district_name=' ')
+        valid = list(self.controller.filter_valid_records(iter(records), batch_size=3))
+        self.assertEqual([records[0], records[2], records[3]] + records[5:], valid)
+        self.assertEqual([1, 4], sorted(self.controller.rejected_records))
+
+    def test_process_s3_object(self):
+        """S3 bodies are streamed, and decompressed if need be"""
+        filename = os.path.join(os.path.dirname(__file__), 'data/orgs.tsv')
+        with open(filename) as data_file:
+            data = data_file.read()
+        expected = list(self.controller.process_file(filename))
+
+        gzipped = StringIO.StringIO()
+        gzip_file = gzip.GzipFile(fileobj=gzipped, mode='wb')
+        gzip_file.write(data)
+        gzip_file.close()
+
+        for body in [data, data.replace('\r\n', '\n'), gzipped.getvalue(), bz2.compress(data)]:
+            lines = list(OrganizationImport.iter_lines(StringIO.StringIO(body), chunk_size=7))
+            self.assertEqual(data.splitlines(), [line.rstrip('\r\n') for line in lines])
+            records = list(self.controller.process_s3_object({'Body': StringIO.StringIO(body)}))
+            self.assertEqual(expected, records)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -58,7 +58,7 @@ class TestYouthApplicationController(unittest.TestCase):
         recording_data = {
             'scoutnet_id': 123,
         }
-        self.app = self.controller.mark_as_recorded(self.app, recording_data)
+        (self.app, _) = self.controller.mark_as_recorded(self.app, recording_data)
         self.assertEqual(Youth.APPLICATION_STATUS_COMPLETE, self.app.status)
 
     def test_guardian_approval_on_file(self):
@@ -98,7 +98,7 @@ class TestYouthApplicationController(unittest.TestCase):
         recording_data = {
             'scoutnet_id': 123,
         }
-        self.app = self.controller.mark_as_recorded(self.app, recording_data)
+        (self.app, _) = self.controller.mark_as_recorded(self.app, recording_data)
         self.assertEqual(Youth.APPLICATION_STATUS_COMPLETE, self.app.status)
 
     def test_guardian_rejection(self):
@@ -129,6 +129,28 @@ class TestYouthApplicationController(unittest.TestCase):
         self.app = self.controller.submit_unit_rejection(self.app, data)
         self.assertEqual(Youth.APPLICATION_STATUS_REJECTED, self.app.status)
 
+    def test_partial_application(self):
+        """Steps that don't need the stored record work on a partial application"""
+        app = FakeYouthApplicationFactory().construct_for_transition(
+            'yap-TEST-1',
+            Youth.APPLICATION_STATUS_FEE_PENDING,
+        )
+        fee_data = {
+            'fee_payment_user_uuid': 'usr-TEST-123',
+            'fee_payment_receipt': 123
+        }
+        app = self.controller.pay_fees(app, fee_data)
+        self.assertEqual(Youth.APPLICATION_STATUS_READY_FOR_SCOUTNET, app.status)
+
+        unverified = app.get_validator().get_unverified_required_fields()
+        self.assertIn('unit_approval_signature', unverified)
+        self.assertIn('first_name', unverified)
+        self.assertNotIn('status', unverified)
+        self.assertEqual(
+            set(['status', 'fee_payment_date', 'fee_payment_user_uuid', 'fee_payment_receipt']),
+            set(app.get_changes().keys()),
+        )
+
     def test_invalid_workflows(self):
         """Test invalid workflow exceptions"""
         with self.assertRaises(InvalidActionException):
@@ -149,7 +171,7 @@ class TestYouthApplicationController(unittest.TestCase):
             recording_data = {
                 'scoutnet_id': 123,
             }
-            self.app = self.controller.mark_as_recorded(self.app, recording_data)
+            (self.app, _) = self.controller.mark_as_recorded(self.app, recording_data)
 
         with self.assertRaises(InvalidActionException):
             self.app = self.controller.submit_application(self.app)
@@ -0,0 +1,97 @@
+# pylint: disable=no-member,attribute-defined-outside-init,import-error
+"""Tests organization lambda code"""
+from __future__ import absolute_import
+
+import json
+import os
+import StringIO
+import threading
+import unittest
+
+import botocore.exceptions
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+
+import lambda_organization  # pylint: disable=wrong-import-position
+
+HEADER = 'District No\tDistrict Name\tSub District #\tStake/Sub District Name\tUnit No\tWard/Sponsoring Org\n'
+
+
+class FakeS3(object):
+    """Fake S3 client serving one file"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def get_object(self, Bucket, Key):  # pylint: disable=invalid-name,unused-argument
+        """Fake get_object"""
+        return {'Body': StringIO.StringIO(self.data)}
+
+
+class FakeSNS(object):
+    """Fake SNS client recording published messages; throttles the first few calls"""
+
+    def __init__(self, throttled_calls=0):
+        self.messages = []
+        self.throttled_calls = throttled_calls
+        self._lock = threading.Lock()
+
+    def publish(self, TopicArn, Subject, Message):  # pylint: disable=invalid-name,unused-argument
+        """Fake publish"""
+        with self._lock:
+            if self.throttled_calls > 0:
+                self.throttled_calls = self.throttled_calls - 1
+                raise botocore.exceptions.ClientError(
+                    {'Error': {'Code': 'Throttling', 'Message': 'Rate exceeded'}},
+                    'Publish',
+                )
+            self.messages.append(json.loads(Message))
+        return {'MessageId': str(len(self.messages))}
+
+
+class TestOrganizationLambda(unittest.TestCase):
+    """Tests the organization lambda handlers"""
+
+    def setUp(self):
+        """Init"""
+        self.saved = dict([
+            (name, getattr(lambda_organization, name)) for name in ('S3', 'SNS', 'IMPORT_DIFFERENTIAL')
+        ])
+        lambda_organization.SNS = FakeSNS()
+        lambda_organization.IMPORT_DIFFERENTIAL = False
+
+    def tearDown(self):
+        """Clean up"""
+        for (name, value) in self.saved.items():
+            setattr(lambda_organization, name, value)
+
+    def test_import_data_rejects_invalid_records(self):
+        """Records that don't validate are reported, not queued"""
+        lambda_organization.S3 = FakeS3(HEADER + ''.join([
+            '5\tProvo Peak\t9\tProvo North Park Stake\t1455\tNorth Park Third Ward\n',
+            '5\tProvo Peak\t8\t \t51\tProvo Elks Lodge\n',
+            '1\tPorter Rockwell\t3\tLehi Stake\t1\tLehi First Ward\n',
+        ]))
+        event = {'Records': [{'s3': {'bucket': {'name': 'orgs'}, 'object': {'key': 'orgs.tsv'}}}]}
+        response = lambda_organization.import_data(event, None)
+
+        self.assertEqual(2, response['records_processed'])
+        self.assertEqual(1, response['records_rejected'])
+        self.assertIn('Missing required field "name"', response['rejections'][1])
+        queued = [record['sporg_number'] for message in lambda_organization.SNS.messages
+                  for record in message['records']]
+        self.assertEqual(['1455', '1'], queued)
+
+    def test_queue_updates(self):
+        """Messages are published one per call, and throttled calls retried"""
+        lambda_organization.SNS = FakeSNS(throttled_calls=2)
+        messages = [[{'sporg_number': str(number)}] for number in range(12)]
+        lambda_organization._queue_updates(messages)  # pylint: disable=protected-access
+        self.assertEqual(
+            [str(number) for number in range(12)],
+            sorted([message['records'][0]['sporg_number'] for message in lambda_organization.SNS.messages], key=int),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
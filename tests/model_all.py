@@ -5,6 +5,7 @@ import unittest
 
 from models import COUNCIL_ID
 from models import AdultApplications
+from models import Base
 from models import CharterApplications
 from models import Guardian
 from models import SponsoringOrganization
@@ -95,6 +96,31 @@ class TestYouth(ModelTestCase):
         duplicates = self.persister.find_potential_duplicates(obj)
         self.assertEqual(0, len(duplicates))
 
+    def test_batch_validation(self):
+        """Many records are validated at once"""
+        rows = [
+            dict(uuid='yth-1', units=['123'], first_name='Ben', last_name='Reece', date_of_birth='2000-01-01'),
+            dict(uuid='yth-2', units=[], first_name='Ben', last_name='', date_of_birth='2000-01-01'),
+            dict(uuid='yth-3', color='blue'),
+            self.obj,
+        ]
+        errors = Base.BatchValidator(self.factory).validate(rows)
+        self.assertEqual([1, 2], sorted(errors.keys()))
+        self.assertEqual(['Missing required field "last_name"', 'Missing required field "units"'], errors[1])
+        self.assertEqual(['Unknown "Youth" field "color"'], errors[2])
+
+    def test_lazy_uuid(self):
+        """UUIDs are only generated when they're needed"""
+        obj = Youth.Youth()
+        self.assertNotIn('uuid', obj.__dict__)
+        uuid = obj.uuid
+        self.assertEqual(uuid, obj.uuid)
+        self.assertEqual(uuid, obj.to_dict()['uuid'])
+
+        obj = self.factory.load_by_uuid('yth-TEST-1')
+        self.assertEqual('yth-TEST-1', obj.uuid)
+        self.assertIn('uuid', obj.fields())
+
 
 class TestVolunteer(ModelTestCase):
 
@@ -170,6 +196,14 @@ class TestUnit(ModelTestCase):
         """Validate the UUID prefix"""
         self.assertEquals('unt', self.obj.uuid[0:3])
 
+    def test_schema(self):
+        """The class schema maps stored attributes to fields"""
+        schema = Unit.Unit.get_schema()
+        self.assertIs(schema, Unit.Unit.get_schema())
+        self.assertEqual('number', schema.field_names['_number'])
+        self.assertEqual(schema.fields, frozenset(self.obj.fields()))
+        self.assertEqual(1455, self.obj.to_dict()['number'])
+
 
 class TestYouthApplication(ModelTestCase):
 
@@ -201,6 +235,34 @@ class TestYouthApplication(ModelTestCase):
         """Validate the UUID prefix"""
         self.assertEquals('yap', self.obj.uuid[0:3])
 
+    def test_compiled_requirements(self):
+        """Required fields are compiled once per status"""
+        self.obj.status = Youth.APPLICATION_STATUS_CREATED
+        required_fields = self.validator.get_required_fields()
+        self.assertIs(required_fields, self.obj.get_validator().get_required_fields())
+        self.assertNotIn('guardian_approval_signature', required_fields)
+        self.obj.status = Youth.APPLICATION_STATUS_UNIT_APPROVAL
+        self.assertIn('guardian_approval_signature', self.validator.get_required_fields())
+
+        errors = self.validator.get_validation_errors()
+        self.assertEqual(3, len(errors))
+
+    def test_incremental_validation(self):
+        """Incremental validation only re-checks what changed"""
+        self.obj.status = Youth.APPLICATION_STATUS_CREATED
+        self.obj.validate()
+        self.assertEqual(set(), self.obj.get_changes_since_validation(Youth.APPLICATION_STATUS_CREATED))
+
+        self.obj.first_name = ''
+        self.assertEqual(['Missing required field "first_name"'], self.validator.get_validation_errors(True))
+        with self.assertRaises(Youth.Base.InvalidObjectException):
+            self.obj.validate()
+
+        # A status change brings in new requirements, so everything is checked
+        self.obj.first_name = 'Ben'
+        self.obj.status = Youth.APPLICATION_STATUS_UNIT_APPROVAL
+        self.assertEqual(3, len(self.validator.get_validation_errors(True)))
+
     def test_guardian_signature(self):
         """Test guardian signature validation"""
         self.obj.status = Youth.APPLICATION_STATUS_UNIT_APPROVAL
@@ -0,0 +1,234 @@
+# pylint: disable=no-member,attribute-defined-outside-init,import-error
+"""Tests Cache"""
+
+import time
+import unittest
+
+import botocore.exceptions
+
+from models import Cache
+from models import Connection
+from models import Organization
+from models import Unit
+
+
+class FakeOrganizationTable(object):
+    """Fake Organizations table counting reads"""
+
+    def __init__(self, items):
+        self.items = items
+        self.reads = 0
+
+    def get_item(self, Key):  # pylint: disable=invalid-name
+        """Fake get_item"""
+        self.reads = self.reads + 1
+        if Key['uuid'] in self.items:
+            return {'Item': dict(self.items[Key['uuid']])}
+        return {}
+
+    def put_item(self, **kwargs):
+        """Fake put_item"""
+        self.items[kwargs['Item']['uuid']] = kwargs['Item']
+
+
+class FakeVersionTable(object):
+    """Fake CacheVersions table; fails every write if `broken`"""
+
+    def __init__(self, broken=False):
+        self.versions = {}
+        self.slots = {}
+        self.reads = 0
+        self.writes = 0
+        self.broken = broken
+
+    def get_item(self, Key):  # pylint: disable=invalid-name
+        """Fake get_item"""
+        self.reads = self.reads + 1
+        if Key['uuid'] in self.slots:
+            return {'Item': dict(self.slots[Key['uuid']])}
+        if Key['uuid'] in self.versions:
+            return {'Item': {'uuid': Key['uuid'], 'version': self.versions[Key['uuid']]}}
+        return {}
+
+    def update_item(self, Key, **kwargs):  # pylint: disable=invalid-name,unused-argument
+        """Fake update_item adding 1 to the version"""
+        self._write()
+        self.versions[Key['uuid']] = self.versions.get(Key['uuid'], 0) + 1
+        return {'Attributes': {'version': self.versions[Key['uuid']]}}
+
+    def put_item(self, Item):  # pylint: disable=invalid-name
+        """Fake put_item"""
+        self._write()
+        self.slots[Item['uuid']] = Item
+
+    def _write(self):
+        """Count the write, or fail it"""
+        self.writes = self.writes + 1
+        if self.broken:
+            raise botocore.exceptions.ClientError(
+                {'Error': {'Code': 'ResourceNotFoundException', 'Message': 'No such table'}},
+                'UpdateItem',
+            )
+
+
+class FakeUnitPersister(Unit.Persister):
+    """Unit persister backed by a fake table"""
+
+    def __init__(self, table):  # pylint: disable=super-init-not-called
+        self.dynamodb = None
+        self.table = table
+
+
+class TestCache(unittest.TestCase):
+
+    """Tests Cache"""
+
+    def setUp(self):
+        """Init"""
+        self.version = Organization.CACHE.version
+        Organization.CACHE.version = None
+        Organization.CACHE.clear()
+
+    def tearDown(self):
+        """Clean up"""
+        Organization.CACHE.version = self.version
+        Organization.CACHE.clear()
+        Connection.reset()
+
+    def test_lru(self):
+        """Least recently used entries are evicted"""
+        cache = Cache.LRUCache(max_size=2, ttl=60)
+        cache.set('a', {'uuid': 'a'})
+        cache.set('b', {'uuid': 'b'})
+        cache.get('a')
+        cache.set('c', {'uuid': 'c'})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual({'uuid': 'a'}, cache.get('a'))
+        self.assertEqual({'size': 2, 'hits': 2, 'misses': 1, 'evictions': 1}, cache.get_stats())
+
+    def test_ttl(self):
+        """Entries expire"""
+        cache = Cache.LRUCache(max_size=2, ttl=0.01)
+        cache.set('a', {'uuid': 'a'})
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a'))
+
+    def test_copies(self):
+        """Callers can't change cached values"""
+        cache = Cache.LRUCache()
+        value = {'youth': ['yth-1']}
+        cache.set('a', value)
+        value['youth'].append('yth-2')
+        cache.get('a')['youth'].append('yth-3')
+        self.assertEqual({'youth': ['yth-1']}, cache.get('a'))
+
+    def test_disabled(self):
+        """A cache without a size caches nothing"""
+        cache = Cache.LRUCache(max_size=0)
+        cache.set('a', {'uuid': 'a'})
+        self.assertIsNone(cache.get('a'))
+
+    def test_organization_reads(self):
+        """Organization reads are cached and writes invalidate them"""
+        table = FakeOrganizationTable({
+            'unt-1.spo-1': {'uuid': 'unt-1.spo-1', 'number': '1', 'name': 'Pack'},
+        })
+        persister = FakeUnitPersister(table)
+        persister.get({'uuid': 'unt-1.spo-1'})
+        persister.get({'uuid': 'unt-1.spo-1'})
+        self.assertEqual(1, table.reads)
+
+        unit = Unit.Factory().construct({
+            'number': '1',
+            'parent_uuid': 'spo-1',
+            'name': 'Troop',
+            'lds_unit': False,
+        })
+        persister.save(unit)
+        self.assertEqual('Troop', persister.get({'uuid': 'unt-1.spo-1'})['name'])
+        self.assertEqual(2, table.reads)
+
+    def test_invalidation_bus(self):
+        """Published keys are dropped from subscribed caches"""
+        Organization.CACHE.set('dst-5.cnl-591', {'uuid': 'dst-5.cnl-591'})
+        Organization.CACHE.set('dst-6.cnl-591', {'uuid': 'dst-6.cnl-591'})
+        received = []
+        Cache.subscribe(Organization.CACHE_CHANNEL, received.extend)
+        try:
+            Cache.publish(Organization.CACHE_CHANNEL, ['dst-5.cnl-591'])
+        finally:
+            Cache.unsubscribe(Organization.CACHE_CHANNEL, received.extend)
+        self.assertEqual(['dst-5.cnl-591'], received)
+        self.assertNotIn('dst-5.cnl-591', Organization.CACHE)
+        self.assertIn('dst-6.cnl-591', Organization.CACHE)
+
+    def test_version_stamp(self):
+        """Changes made by other processes clear the cache once it checks"""
+        table = FakeVersionTable()
+        Connection._TABLES[Cache.VERSION_TABLE] = table  # pylint: disable=protected-access
+        cache = Cache.LRUCache(version=Cache.VersionStamp('test', check_interval=0.05))
+        cache.set('a', {'uuid': 'a'})
+        self.assertEqual({'uuid': 'a'}, cache.get('a'))
+
+        # Another process writes
+        Cache.VersionStamp('test').bump()
+        self.assertEqual({'uuid': 'a'}, cache.get('a'))
+        time.sleep(0.06)
+        self.assertIsNone(cache.get('a'))
+        self.assertLess(table.reads, 5)
+
+    def test_version_stamp_keys(self):
+        """Other processes' changes drop only the keys they name"""
+        table = FakeVersionTable()
+        Connection._TABLES[Cache.VERSION_TABLE] = table  # pylint: disable=protected-access
+        cache = Cache.LRUCache(version=Cache.VersionStamp('test', check_interval=0.05))
+        cache.set('a', {'uuid': 'a'})
+        cache.set('b', {'uuid': 'b'})
+        cache.set('c', {'uuid': 'c'})
+
+        Cache.VersionStamp('test').bump(['a'])
+        Cache.VersionStamp('test').bump(['b', 'a'])
+        time.sleep(0.06)
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual({'uuid': 'c'}, cache.get('c'))
+
+        # The slots for skipped versions have been reused
+        for _ in range(Cache.CHANGE_LOG_SIZE + 1):
+            Cache.VersionStamp('test').bump(['a'])
+        time.sleep(0.06)
+        self.assertIsNone(cache.get('c'))
+
+    def test_deferred_invalidation(self):
+        """Bulk writes bump the version once, and a failed bump isn't fatal"""
+        table = FakeVersionTable()
+        Connection._TABLES[Cache.VERSION_TABLE] = table  # pylint: disable=protected-access
+        Organization.CACHE.version = Cache.VersionStamp(Organization.CACHE_CHANNEL)
+        persister = FakeUnitPersister(FakeOrganizationTable({}))
+        with Organization.deferred_invalidation():
+            for number in range(3):
+                persister.save(Unit.Factory().construct({
+                    'number': str(number),
+                    'parent_uuid': 'spo-1',
+                    'name': 'Troop',
+                    'lds_unit': False,
+                }))
+            self.assertEqual(0, table.writes)
+        self.assertEqual(1, table.versions[Organization.CACHE_CHANNEL])
+        self.assertEqual(
+            ['unt-0.spo-1', 'unt-1.spo-1', 'unt-2.spo-1'],
+            table.slots[Organization.CACHE_CHANNEL + '#1']['keys'],
+        )
+
+        table.broken = True
+        persister.save(Unit.Factory().construct({
+            'number': '3',
+            'parent_uuid': 'spo-1',
+            'name': 'Troop',
+            'lds_unit': False,
+        }))
+        self.assertIn('unt-3.spo-1', persister.table.items)
+
+
+if __name__ == '__main__':
+    unittest.main()
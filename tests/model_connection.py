@@ -0,0 +1,41 @@
+# pylint: disable=no-member,attribute-defined-outside-init,import-error
+"""Tests DynamoDB connection pool"""
+
+import unittest
+
+from models import Connection
+
+
+class TestConnection(unittest.TestCase):
+
+    """Tests Connection module"""
+
+    def setUp(self):
+        """Init"""
+        Connection.configure(region_name='us-west-2', max_pool_connections=10)
+
+    def tearDown(self):
+        """Clean up"""
+        Connection.reset()
+
+    def test_table_reuse(self):
+        """Table objects are shared by table name"""
+        table = Connection.get_table('People')
+        self.assertIs(table, Connection.get_table('People'))
+        self.assertIsNot(table, Connection.get_table('Organizations'))
+        self.assertIs(Connection.get_resource(), Connection.get_resource())
+
+    def test_reset(self):
+        """Reset discards pooled objects"""
+        table = Connection.get_table('People')
+        Connection.reset()
+        self.assertIsNot(table, Connection.get_table('People'))
+
+    def test_invalid_setting(self):
+        """Unknown settings are rejected"""
+        with self.assertRaises(Exception):
+            Connection.configure(foo='bar')
+
+
+if __name__ == '__main__':
+    unittest.main()
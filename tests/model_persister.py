@@ -0,0 +1,373 @@
+# pylint: disable=no-member,attribute-defined-outside-init,import-error
+"""Tests Base.Persister"""
+
+import unittest
+
+import boto3
+import botocore.stub
+
+from models import Base
+from models import Connection
+from models import Guardian
+from models import Tables
+
+
+class FakeDynamoDB(object):
+    """Fake DynamoDB service resource"""
+
+    def __init__(self, unprocessed_rounds=0):
+        self.items = {}
+        self.calls = 0
+        self.unprocessed_rounds = unprocessed_rounds
+
+    def batch_write_item(self, RequestItems):  # pylint: disable=invalid-name
+        """Fake batch_write_item; leaves the last request unprocessed for a few rounds"""
+        self.calls = self.calls + 1
+        response = {'UnprocessedItems': {}}
+        for table_name, requests in RequestItems.items():
+            assert len(requests) <= Base.BATCH_WRITE_SIZE
+            if self.unprocessed_rounds > 0:
+                self.unprocessed_rounds = self.unprocessed_rounds - 1
+                response['UnprocessedItems'][table_name] = requests[-1:]
+                requests = requests[:-1]
+            for request in requests:
+                if 'PutRequest' in request:
+                    item = request['PutRequest']['Item']
+                    self.items[item['uuid']] = item
+                else:
+                    del self.items[request['DeleteRequest']['Key']['uuid']]
+        return response
+
+    def batch_get_item(self, RequestItems):  # pylint: disable=invalid-name
+        """Fake batch_get_item; leaves the last key unprocessed for a few rounds"""
+        self.calls = self.calls + 1
+        response = {'Responses': {}, 'UnprocessedKeys': {}}
+        for table_name, request in RequestItems.items():
+            keys = request['Keys']
+            assert len(keys) <= Base.BATCH_GET_SIZE
+            if self.unprocessed_rounds > 0:
+                self.unprocessed_rounds = self.unprocessed_rounds - 1
+                response['UnprocessedKeys'][table_name] = {'Keys': keys[-1:]}
+                keys = keys[:-1]
+            response['Responses'][table_name] = [
+                self.items[key['uuid']] for key in keys if key['uuid'] in self.items
+            ]
+        return response
+
+
+class FakeTable(object):
+    """Fake DynamoDB Table returning pre-built items in pages"""
+
+    def __init__(self, items, page_size):
+        self.items = items
+        self.page_size = page_size
+        self.calls = 0
+        self.writes = []
+        self.last_query = None
+
+    def query(self, **kwargs):
+        """Fake query; ignores the conditions"""
+        self.calls = self.calls + 1
+        self.last_query = kwargs
+        start = 0
+        if 'ExclusiveStartKey' in kwargs:
+            start = int(kwargs['ExclusiveStartKey']['uuid'].split('-')[1]) + 1
+        page_size = min(self.page_size, kwargs.get('Limit', self.page_size))
+        result = {'Items': self.items[start:start + page_size]}
+        if start + page_size < len(self.items):
+            result['LastEvaluatedKey'] = {'uuid': result['Items'][-1]['uuid']}
+        return result
+
+    def put_item(self, **kwargs):
+        """Fake put_item"""
+        self.writes.append(('put', kwargs))
+
+    def update_item(self, **kwargs):
+        """Fake update_item"""
+        self.writes.append(('update', kwargs))
+
+
+class FakeGuardianFactory(Guardian.Factory):
+    """Guardian factory backed by a fake DynamoDB"""
+
+    def __init__(self, dynamodb):
+        super(FakeGuardianFactory, self).__init__()
+        self.dynamodb = dynamodb
+
+    def get_persister(self):
+        return FakeGuardianPersister(self.dynamodb)
+
+
+class FakeGuardianPersister(Guardian.Persister):
+    """Guardian persister backed by a fake DynamoDB"""
+
+    def __init__(self, dynamodb):  # pylint: disable=super-init-not-called
+        self.dynamodb = dynamodb
+        self.table = None
+
+
+class TestPersister(unittest.TestCase):
+
+    """Tests Base.Persister"""
+
+    @staticmethod
+    def _get_guardians(count):
+        """Build some valid Guardian objects"""
+        guardians = []
+        for i in range(count):
+            guardian = Guardian.Factory().construct({
+                'uuid': 'gdn-{}'.format(i),
+                'user_uuid': 'usr-{}'.format(i),
+                'first_name': 'First',
+                'last_name': 'Last',
+                'youth': ['yth-1'],
+            })
+            guardians.append(guardian)
+        return guardians
+
+    def test_save_many(self):
+        """Objects are chunked and unprocessed items are retried"""
+        dynamodb = FakeDynamoDB(unprocessed_rounds=2)
+        persister = FakeGuardianPersister(dynamodb)
+        guardians = self._get_guardians(60)
+        invalid = Guardian.Guardian()
+        result = persister.save_many(guardians + [invalid])
+
+        self.assertEqual(60, len(result['succeeded']))
+        self.assertEqual(1, len(result['failed']))
+        self.assertIs(invalid, result['failed'][0][0])
+        self.assertEqual(60, len(dynamodb.items))
+        self.assertEqual(5, dynamodb.calls)
+
+    def test_delete_many(self):
+        """Objects are deleted in batches"""
+        dynamodb = FakeDynamoDB()
+        persister = FakeGuardianPersister(dynamodb)
+        guardians = self._get_guardians(30)
+        persister.save_many(guardians)
+        result = persister.delete_many(guardians[:26])
+        self.assertEqual(26, len(result['succeeded']))
+        self.assertEqual(4, len(dynamodb.items))
+
+    def test_duplicate_keys(self):
+        """Repeated keys go in separate batches"""
+        dynamodb = FakeDynamoDB()
+        persister = FakeGuardianPersister(dynamodb)
+        guardian = self._get_guardians(1)[0]
+        result = persister.save_many([guardian, guardian])
+        self.assertEqual(2, len(result['succeeded']))
+        self.assertEqual(2, dynamodb.calls)
+
+    def test_load_many_by_uuid(self):
+        """Objects are loaded in batches, in the order requested"""
+        dynamodb = FakeDynamoDB()
+        FakeGuardianPersister(dynamodb).save_many(self._get_guardians(150))
+        dynamodb.calls = 0
+        dynamodb.unprocessed_rounds = 1
+
+        uuids = ['gdn-{}'.format(i) for i in reversed(range(150))] + ['gdn-missing', 'gdn-3']
+        guardians = FakeGuardianFactory(dynamodb).load_many_by_uuid(uuids)
+
+        self.assertEqual(151, len(guardians))
+        self.assertEqual('gdn-149', guardians[0].uuid)
+        self.assertEqual('gdn-0', guardians[149].uuid)
+        self.assertEqual('gdn-3', guardians[150].uuid)
+        self.assertEqual(3, dynamodb.calls)
+
+    def test_load_compact(self):
+        """Compact records can be loaded, converted, and validated"""
+        dynamodb = FakeDynamoDB()
+        FakeGuardianPersister(dynamodb).save_many(self._get_guardians(3))
+        guardians = FakeGuardianFactory(dynamodb).load_many_by_uuid(['gdn-2', 'gdn-0'], compact=True)
+
+        self.assertEqual(['gdn-2', 'gdn-0'], [guardian.uuid for guardian in guardians])
+        guardian = guardians[0]
+        self.assertFalse(hasattr(guardian, '__dict__'))
+        self.assertEqual(self._get_guardians(3)[2].to_dict(), guardian.to_dict())
+        self.assertEqual('gdn', guardian.get_uuid_prefix())
+        guardian.validate()
+        with self.assertRaises(AttributeError):
+            guardian.first_name = 'Other'
+
+        invalid = Guardian.Factory().construct_compact({'uuid': 'gdn-9'})
+        self.assertFalse(invalid.get_validator().valid())
+        with self.assertRaises(Exception):
+            Guardian.Factory().construct_compact({'uuid': 'gdn-9', 'color': 'blue'})
+
+    def test_query_iter(self):
+        """Query results follow pagination lazily"""
+        persister = FakeGuardianPersister(FakeDynamoDB())
+        persister.table = FakeTable([{'uuid': 'gdn-{}'.format(i)} for i in range(25)], 10)
+
+        self.assertEqual(25, len(persister.query({'user_uuid': 'usr-1'})))
+        self.assertEqual(3, persister.table.calls)
+
+        persister.table.calls = 0
+        items = list(persister.query_iter({'user_uuid': 'usr-1'}, limit=12))
+        self.assertEqual(12, len(items))
+        self.assertEqual(2, persister.table.calls)
+
+    def test_scan(self):
+        """Scan segments share the thread-safe client and get plain values back"""
+        client = boto3.client(
+            'dynamodb',
+            region_name='us-west-2',
+            aws_access_key_id='test',
+            aws_secret_access_key='test',
+        )
+        Connection._CLIENT = client  # pylint: disable=protected-access
+        try:
+            with botocore.stub.Stubber(client) as stubber:
+                # Parameters are checked against the API model
+                for num in range(Base.SCAN_SEGMENTS):
+                    stubber.add_response('scan', {'Items': [{'uuid': {'S': 'gdn-{}'.format(num)}}]})
+                persister = FakeGuardianPersister(FakeDynamoDB())
+                items = list(persister.query_iter({'first_name': 'First'}, page_size=5, allow_scan=True))
+                stubber.assert_no_pending_responses()
+        finally:
+            Connection.reset()
+        self.assertEqual(
+            ['gdn-{}'.format(num) for num in range(Base.SCAN_SEGMENTS)],
+            sorted([item['uuid'] for item in items]),
+        )
+
+        args = persister._get_client_args({  # pylint: disable=protected-access
+            'FilterExpression': Base.plan_query({'first_name': 'First'}, [], True)[1]['FilterExpression'],
+            'ExclusiveStartKey': {'uuid': 'gdn-1'},
+            'Limit': 5,
+        })
+        self.assertEqual('People', args['TableName'])
+        self.assertEqual('#n0 = :v0', args['FilterExpression'])
+        self.assertEqual({'#n0': 'first_name'}, args['ExpressionAttributeNames'])
+        self.assertEqual({':v0': {'S': 'First'}}, args['ExpressionAttributeValues'])
+        self.assertEqual({'uuid': {'S': 'gdn-1'}}, args['ExclusiveStartKey'])
+
+    def test_keys_only_filter(self):
+        """Non-key predicates on a KEYS_ONLY index are applied to the loaded records"""
+        dynamodb = FakeDynamoDB()
+        persister = FakeGuardianPersister(dynamodb)
+        for guardian in self._get_guardians(6):
+            if int(guardian.uuid.split('-')[1]) % 2:
+                guardian.first_name = 'Other'
+            dynamodb.items[guardian.uuid] = guardian.to_dict()
+        persister.table = FakeTable([{'uuid': 'gdn-{}'.format(i)} for i in range(6)], 4)
+
+        items = list(persister.query_iter({'user_uuid': 'usr-1', 'first_name': 'First'}))
+        self.assertNotIn('FilterExpression', persister.table.last_query)
+        self.assertEqual(['gdn-0', 'gdn-2', 'gdn-4'], [item['uuid'] for item in items])
+        self.assertEqual('Last', items[0]['last_name'])
+
+        (items, cursor) = persister.query_page({'user_uuid': 'usr-1', 'first_name': 'Other'}, 4)
+        self.assertEqual(['gdn-1', 'gdn-3'], [item['uuid'] for item in items])
+        self.assertNotEqual(None, cursor)
+
+    def test_query_page(self):
+        """Query pages can be resumed with a cursor"""
+        persister = FakeGuardianPersister(FakeDynamoDB())
+        persister.table = FakeTable([{'uuid': 'gdn-{}'.format(i)} for i in range(15)], 100)
+
+        (items, cursor) = persister.query_page({'user_uuid': 'usr-1'}, 10)
+        self.assertEqual(10, len(items))
+        (items, cursor) = persister.query_page({'user_uuid': 'usr-1'}, 10, cursor)
+        self.assertEqual(5, len(items))
+        self.assertEqual('gdn-10', items[0]['uuid'])
+        self.assertEqual(None, cursor)
+
+        with self.assertRaises(Base.InvalidQueryException):
+            persister.query_page({'user_uuid': 'usr-1'}, 10, 'not a cursor')
+
+    def test_plan_query(self):
+        """The planner picks the best index and filters the rest"""
+        indexes = [
+            ('parent_uuid', 'parent_uuid', None, Tables.KEYS_ONLY),
+            ('number', 'number', 'type', Tables.KEYS_ONLY),
+        ]
+        (operation, args, post_filters) = Base.plan_query(
+            {'number': '5', 'type': 'District', 'name': 'Provo Peak'}, indexes)
+        self.assertEqual('query', operation)
+        self.assertEqual('number', args['IndexName'])
+        self.assertNotIn('FilterExpression', args)
+        self.assertEqual([('name', 'eq', 'Provo Peak')], post_filters)
+
+        (operation, args, post_filters) = Base.plan_query(
+            {'parent_uuid': 'dst-5', 'number__begins_with': '5'}, indexes)
+        self.assertEqual('parent_uuid', args['IndexName'])
+        self.assertNotIn('FilterExpression', args)
+        self.assertEqual([('number', 'begins_with', '5')], post_filters)
+
+        (operation, args, post_filters) = Base.plan_query(
+            {'parent_uuid': 'dst-5', 'number__begins_with': '5'}, [index[:3] for index in indexes])
+        self.assertIn('FilterExpression', args)
+        self.assertEqual([], post_filters)
+
+        (operation, args, post_filters) = Base.plan_query({'uuid': 'dst-5', 'parent_uuid': 'cnl-591'}, indexes)
+        self.assertNotIn('IndexName', args)
+        self.assertIn('FilterExpression', args)
+        self.assertEqual([], post_filters)
+
+        with self.assertRaises(Base.InvalidQueryException):
+            Base.plan_query({'name': 'Provo Peak'}, indexes)
+        with self.assertRaises(Base.InvalidQueryException):
+            Base.plan_query({'__index__': 'status', 'status': 'Created'}, indexes)
+        with self.assertRaises(Base.InvalidQueryException):
+            Base.plan_query({'name__like': 'Provo'}, indexes)
+
+        (operation, args, post_filters) = Base.plan_query({'name': 'Provo Peak'}, indexes, allow_scan=True)
+        self.assertEqual('scan', operation)
+        self.assertIn('FilterExpression', args)
+        self.assertEqual([], post_filters)
+
+    def test_match_predicates(self):
+        """Predicates are evaluated like DynamoDB filters"""
+        item = {'number': '591', 'name': 'Provo Peak', 'youth': ['yth-1']}
+        self.assertTrue(Base.match_predicates(item, [('number', 'begins_with', '59'), ('name', 'ne', 'Orem')]))
+        self.assertTrue(Base.match_predicates(item, [('number', 'between', ['500', '600'])]))
+        self.assertTrue(Base.match_predicates(item, [('youth', 'contains', 'yth-1')]))
+        self.assertFalse(Base.match_predicates(item, [('number', 'gt', '600')]))
+        self.assertFalse(Base.match_predicates(item, [('type', 'ne', 'District')]))
+
+    def test_partial_update(self):
+        """Only changed fields of loaded objects are written"""
+        persister = FakeGuardianPersister(FakeDynamoDB())
+        persister.table = FakeTable([], 10)
+        guardian = self._get_guardians(1)[0]
+
+        persister.save(guardian)
+        self.assertEqual('put', persister.table.writes[-1][0])
+
+        persister.save(guardian)
+        self.assertEqual(1, len(persister.table.writes))
+
+        guardian.first_name = 'Other'
+        guardian.last_name = ''
+        guardian.youth.append('yth-2')
+        self.assertEqual(['first_name', 'last_name', 'youth'], sorted(guardian.get_changes().keys()))
+        with self.assertRaises(Base.InvalidObjectException):
+            persister.save(guardian)
+
+        guardian.last_name = 'Last'
+        persister.save(guardian)
+        (operation, args) = persister.table.writes[-1]
+        self.assertEqual('update', operation)
+        self.assertEqual({'uuid': 'gdn-0'}, args['Key'])
+        self.assertEqual('SET #f0 = :v0, #f1 = :v1', args['UpdateExpression'])
+        self.assertEqual({'#key': 'uuid', '#f0': 'first_name', '#f1': 'youth'}, args['ExpressionAttributeNames'])
+
+    def test_update_args(self):
+        """Blank fields are removed"""
+        args = Base.Persister.get_update_args('gdn-0', {'first_name': 'Ben', 'last_name': ''})
+        self.assertEqual('SET #f0 = :v0 REMOVE #f1', args['UpdateExpression'])
+        self.assertEqual({':v0': 'Ben'}, args['ExpressionAttributeValues'])
+        self.assertEqual('attribute_exists(#key)', args['ConditionExpression'])
+
+        args = Base.Persister.get_update_args('yap-0', {'status': 'Complete'}, {'status': 'Created'}, ['first_name'])
+        self.assertEqual(
+            'attribute_exists(#key) AND #e0 = :e0 AND attribute_exists(#r0)',
+            args['ConditionExpression'],
+        )
+        self.assertEqual('Created', args['ExpressionAttributeValues'][':e0'])
+        self.assertEqual('first_name', args['ExpressionAttributeNames']['#r0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
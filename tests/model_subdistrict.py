@@ -4,6 +4,7 @@
 import unittest
 
 from models import COUNCIL_ID
+from models import Organization
 from models import Subdistrict
 
 from . import FakeSubdistrictFactory
@@ -23,6 +24,23 @@ class TestSubdistrict(ModelTestCase):
         """Validate the UUID prefix"""
         self.assertEquals('sbd', self.obj.uuid[0:3])
 
+    def test_uuid_memo(self):
+        """The uuid follows changes to its parts"""
+        obj = Subdistrict.Subdistrict()
+        obj.number = '5-9'
+        obj.parent_uuid = 'dst-5.cnl-'+COUNCIL_ID
+        self.assertEquals('sbd-5-9.dst-5.cnl-'+COUNCIL_ID, obj.uuid)
+        obj.parent_uuid = 'dst-6.cnl-'+COUNCIL_ID
+        self.assertEquals('sbd-5-9.dst-6.cnl-'+COUNCIL_ID, obj.uuid)
+        self.assertEquals(obj.uuid, obj.to_dict()['uuid'])
+
+        self.assertEquals(
+            [obj.parent_uuid, obj.uuid, 'spo-1455.'+obj.uuid],
+            Organization.precompute_uuids('cnl-'+COUNCIL_ID, [('dst', '6'), ('sbd', '5-9'), ('spo', '1455')]),
+        )
+        self.assertEquals(['dst-6.cnl-'+COUNCIL_ID, '', 'spo-1455.'], Organization.precompute_uuids(
+            'cnl-'+COUNCIL_ID, [('dst', '6'), ('sbd', ''), ('spo', '1455')]))
+
 
 if __name__ == '__main__':
     unittest.main()
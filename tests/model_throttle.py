@@ -0,0 +1,117 @@
+# pylint: disable=no-member,attribute-defined-outside-init,import-error
+"""Tests Throttle"""
+
+import time
+import unittest
+
+import botocore.exceptions
+
+from models import Throttle
+
+
+class FlakyCall(object):
+    """Fails with the given error code a few times, then succeeds"""
+
+    def __init__(self, failures, code='ProvisionedThroughputExceededException'):
+        self.failures = failures
+        self.code = code
+        self.calls = 0
+
+    def __call__(self, **kwargs):
+        self.calls = self.calls + 1
+        if self.calls <= self.failures:
+            raise botocore.exceptions.ClientError({'Error': {'Code': self.code}}, 'PutItem')
+        return kwargs
+
+
+class TestThrottle(unittest.TestCase):
+
+    """Tests Throttle"""
+
+    def setUp(self):
+        """Init"""
+        self.backoff_base = Throttle.BACKOFF_BASE_SECONDS
+        Throttle.BACKOFF_BASE_SECONDS = 0.001
+        Throttle.reset_metrics()
+
+    def tearDown(self):
+        """Clean up"""
+        Throttle.BACKOFF_BASE_SECONDS = self.backoff_base
+        Throttle.unlimit_table('Test')
+        Throttle.reset_metrics()
+
+    def test_retry(self):
+        """Throttling errors are retried and counted"""
+        func = FlakyCall(3)
+        self.assertEqual({'Key': 1}, Throttle.call('Test', Throttle.WRITE, 1, func, Key=1))
+        self.assertEqual(4, func.calls)
+        metrics = Throttle.get_metrics()['Test']
+        self.assertEqual(3, metrics['retries'])
+        self.assertEqual(0, metrics['throttling_failures'])
+
+    def test_give_up(self):
+        """Throttling errors are raised after too many attempts"""
+        func = FlakyCall(Throttle.MAX_ATTEMPTS)
+        with self.assertRaises(botocore.exceptions.ClientError):
+            Throttle.call('Test', Throttle.WRITE, 1, func)
+        self.assertEqual(Throttle.MAX_ATTEMPTS, func.calls)
+        self.assertEqual(1, Throttle.get_metrics()['Test']['throttling_failures'])
+
+    def test_other_errors(self):
+        """Other errors aren't retried"""
+        func = FlakyCall(1, 'ConditionalCheckFailedException')
+        with self.assertRaises(botocore.exceptions.ClientError):
+            Throttle.call('Test', Throttle.WRITE, 1, func)
+        self.assertEqual(1, func.calls)
+
+    def test_backoff(self):
+        """Backoff grows with each attempt, up to the maximum"""
+        Throttle.BACKOFF_BASE_SECONDS = 1
+        for attempt in range(10):
+            delay = Throttle.get_backoff_seconds(attempt)
+            self.assertTrue(0 <= delay <= min(Throttle.BACKOFF_MAX_SECONDS, 2 ** attempt))
+
+    def test_limit_table(self):
+        """Rate limits apply only to the limited table"""
+        Throttle.limit_table('Test', 50, read_capacity=1000, write_capacity=0)
+        self.assertEqual(500, Throttle._BUCKETS[('Test', Throttle.READ)].rate)  # pylint: disable=protected-access
+        self.assertNotIn(('Test', Throttle.WRITE), Throttle._BUCKETS)  # pylint: disable=protected-access
+
+        # The burst is used up, then the rate applies
+        for _ in range(3):
+            Throttle.call('Test', Throttle.READ, 250, FlakyCall(0))
+        self.assertGreater(Throttle.get_metrics()['Test']['rate_limited_seconds'], 0)
+        self.assertNotIn('Other', Throttle.get_metrics())
+
+    def test_limit_table_workers(self):
+        """Workers split the budget between them"""
+        Throttle.limit_table('Test', 50, read_capacity=1000, write_capacity=10, workers=4)
+        self.assertEqual(125, Throttle._BUCKETS[('Test', Throttle.READ)].rate)  # pylint: disable=protected-access
+        self.assertEqual(1.25, Throttle._BUCKETS[('Test', Throttle.WRITE)].rate)  # pylint: disable=protected-access
+
+    def test_token_bucket(self):
+        """Tokens refill at the configured rate"""
+        bucket = Throttle.TokenBucket(1000, 10)
+        self.assertEqual(0, bucket.consume(10))
+        self.assertGreater(bucket.consume(5), 0)
+
+    def test_token_bucket_debt(self):
+        """Requests larger than the burst are charged in full"""
+        bucket = Throttle.TokenBucket(1000, 1)
+        start = time.time()
+        for _ in range(3):
+            bucket.consume(25)
+        # 75 units at 1000/s, less the 1 unit burst
+        self.assertGreaterEqual(time.time() - start, 0.07)
+
+    def test_consumed_capacity(self):
+        """Reads are charged what DynamoDB reports they consumed"""
+        Throttle.limit_table('Test', 100, read_capacity=1000, write_capacity=0)
+        bucket = Throttle._BUCKETS[('Test', Throttle.READ)]  # pylint: disable=protected-access
+        page = {'Items': [], 'ConsumedCapacity': {'TableName': 'Test', 'CapacityUnits': 50.0}}
+        Throttle.call('Test', Throttle.READ, 1, lambda: page)
+        self.assertLess(bucket._tokens, 1000 - 49)  # pylint: disable=protected-access
+
+
+if __name__ == '__main__':
+    unittest.main()
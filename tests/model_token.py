@@ -0,0 +1,76 @@
+# pylint: disable=no-member,attribute-defined-outside-init,import-error,protected-access
+"""Tests Token"""
+
+import time
+import unittest
+
+from controllers import Security
+from models import AuthenticationFailureException
+from models import Token
+
+from . import FakeUserFactory
+
+
+class TestToken(unittest.TestCase):
+
+    """Tests Token"""
+
+    def setUp(self):
+        """Init"""
+        self.secret = Token.SECRET
+        Token.SECRET = 'test secret'
+        # Skip loading the revocation list from DynamoDB
+        Token._revoked = set()
+        Token._revoked_loaded_at = time.time()
+        self.user = FakeUserFactory().load_by_uuid('usr-ben')
+
+    def tearDown(self):
+        """Clean up"""
+        Token.SECRET = self.secret
+        Token._revoked = set()
+        Token._revoked_loaded_at = None
+
+    def test_round_trip(self):
+        """The token identifies the user and their roles"""
+        user = Token.get_user(Token.issue(self.user))
+        self.assertEqual('usr-ben', user.uuid)
+        self.assertIn(Security.ROLE_COUNCIL_ADMIN, user.roles)
+        self.assertTrue(user.is_partial())
+
+    def test_tampering(self):
+        """Changed or garbled tokens are rejected"""
+        token = Token.issue(self.user)
+        (body, signature) = token.split('.')
+        other = Token.issue(FakeUserFactory().load_by_uuid('usr-ken'))
+        for bad_token in [other.split('.')[0] + '.' + signature, body, body + '.x', 'x.y.z', None]:
+            with self.assertRaises(AuthenticationFailureException):
+                Token.verify(bad_token)
+
+        Token.SECRET = 'other secret'
+        with self.assertRaises(AuthenticationFailureException):
+            Token.verify(token)
+
+    def test_expiry(self):
+        """Expired tokens are rejected"""
+        token = Token.issue(self.user, expires_after=-1)
+        with self.assertRaises(AuthenticationFailureException):
+            Token.verify(token)
+
+    def test_revocation(self):
+        """Revoked tokens are rejected"""
+        token = Token.issue(self.user)
+        Token._revoked.add(Token.verify(token)['uuid'])
+        with self.assertRaises(AuthenticationFailureException):
+            Token.verify(token)
+
+    def test_disabled(self):
+        """Tokens aren't accepted without a secret"""
+        token = Token.issue(self.user)
+        Token.SECRET = ''
+        self.assertFalse(Token.is_enabled())
+        with self.assertRaises(AuthenticationFailureException):
+            Token.verify(token)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+# pylint: disable=no-member,attribute-defined-outside-init,import-error
+"""Tests UnitOfWork"""
+
+import unittest
+
+import boto3
+import botocore.stub
+
+from controllers import YouthApplication
+from models import Connection
+from models import Transaction
+from models import UnitOfWork
+from models import Youth
+
+from . import FakeUnitFactory
+from . import FakeUserFactory
+from . import FakeYouthApplicationFactory
+from . import FakeYouthFactory
+from . import FakeYouthPersister
+
+
+class RecordingYouthPersister(FakeYouthPersister, Youth.YouthPersister):
+    """Fake persister that counts reads and records writes"""
+
+    def __init__(self):
+        super(RecordingYouthPersister, self).__init__()
+        self.reads = 0
+        self.saved = []
+        self.batch_saved = []
+
+    def get(self, search_data):
+        self.reads = self.reads + 1
+        return super(RecordingYouthPersister, self).get(search_data)
+
+    def save(self, obj, expected=None):
+        """Record the write"""
+        self.saved.append((obj, expected))
+        obj.mark_clean()
+
+    def save_many(self, objs):
+        """Record the batch write"""
+        self.batch_saved.extend(objs)
+        return {'succeeded': objs, 'failed': []}
+
+    @staticmethod
+    def _get_table_name():
+        return 'People'
+
+
+class RecordingYouthFactory(FakeYouthFactory):
+    """Fake factory sharing one recording persister"""
+
+    def __init__(self):
+        super(RecordingYouthFactory, self).__init__()
+        self.persister = RecordingYouthPersister()
+
+    def get_persister(self):
+        return self.persister
+
+
+class TestUnitOfWork(unittest.TestCase):
+
+    """Tests UnitOfWork"""
+
+    def setUp(self):
+        """Init
+
+        Requests are checked against the DynamoDB API model by a stubbed
+        client, and recorded.
+        """
+        self.client = boto3.client(
+            'dynamodb',
+            region_name='us-west-2',
+            aws_access_key_id='test',
+            aws_secret_access_key='test',
+        )
+        self.transactions = []
+        self.client.meta.events.register(
+            'before-parameter-build.dynamodb.TransactWriteItems',
+            lambda params, **kwargs: self.transactions.append(params['TransactItems']),
+        )
+        self.stubber = botocore.stub.Stubber(self.client)
+        self.stubber.activate()
+        Connection._CLIENT = self.client  # pylint: disable=protected-access
+
+    def tearDown(self):
+        """Clean up"""
+        self.stubber.deactivate()
+        Connection.reset()
+
+    def test_identity_map(self):
+        """Each uuid is loaded once per unit of work"""
+        factory = RecordingYouthFactory()
+        with UnitOfWork.UnitOfWork():
+            youth = factory.load_by_uuid('yth-TEST-1')
+            self.assertIs(youth, factory.load_by_uuid('yth-TEST-1'))
+            self.assertIs(youth, factory.load_many_by_uuid(['yth-TEST-2', 'yth-TEST-1'])[1])
+        # one read for each youth
+        self.assertEqual(2, factory.persister.reads)
+        self.assertIsNone(UnitOfWork.get_current())
+
+        self.assertIsNot(youth, factory.load_by_uuid('yth-TEST-1'))
+
+    def test_commit(self):
+        """New and changed objects are written in one transaction at commit"""
+        factory = RecordingYouthFactory()
+        persister = factory.persister
+        with UnitOfWork.UnitOfWork() as work:
+            unchanged = factory.load_by_uuid('yth-TEST-2')
+            changed = factory.load_by_uuid('yth-TEST-1')
+            changed.first_name = 'Matt'
+            new = factory.construct(unchanged.to_dict())
+            new.uuid = 'yth-TEST-3'
+            work.register(new, persister)
+            work.register(unchanged, persister)
+            self.stubber.add_response('transact_write_items', {})
+
+        self.stubber.assert_no_pending_responses()
+        self.assertEqual(1, len(self.transactions))
+        items = self.transactions[0]
+        self.assertEqual(2, len(items))
+        self.assertEqual({'S': 'yth-TEST-3'}, items[0]['Put']['Item']['uuid'])
+        self.assertEqual('People', items[0]['Put']['TableName'])
+        self.assertEqual({'uuid': {'S': 'yth-TEST-1'}}, items[1]['Update']['Key'])
+        self.assertIn({'S': 'Matt'}, items[1]['Update']['ExpressionAttributeValues'].values())
+        self.assertEqual({}, changed.get_changes())
+
+        with self.assertRaises(ValueError):
+            with UnitOfWork.UnitOfWork() as work:
+                changed = factory.load_by_uuid('yth-TEST-1')
+                changed.first_name = 'Matthew'
+                raise ValueError()
+        self.assertEqual(1, len(self.transactions))
+
+    def test_commit_single(self):
+        """A single write is saved without a transaction"""
+        factory = RecordingYouthFactory()
+        persister = factory.persister
+        with UnitOfWork.UnitOfWork() as work:
+            youth = factory.load_by_uuid('yth-TEST-1')
+            youth.first_name = 'Matt'
+            work.register(youth, persister, {'first_name': 'Matthew'})
+        self.assertEqual(0, len(self.transactions))
+        self.assertEqual([(youth, {'first_name': 'Matthew'})], persister.saved)
+
+        with UnitOfWork.UnitOfWork():
+            factory.load_by_uuid('yth-TEST-2')
+        self.assertEqual(1, len(persister.saved))
+
+    def test_commit_batches(self):
+        """Too many writes for a transaction fall back to batches"""
+        factory = RecordingYouthFactory()
+        persister = factory.persister
+        max_items = Transaction.MAX_ITEMS
+        Transaction.MAX_ITEMS = 1
+        try:
+            with UnitOfWork.UnitOfWork() as work:
+                changed = factory.load_by_uuid('yth-TEST-1')
+                changed.first_name = 'Matt'
+                new = factory.construct(factory.load_by_uuid('yth-TEST-2').to_dict())
+                new.uuid = 'yth-TEST-3'
+                work.register(new, persister)
+        finally:
+            Transaction.MAX_ITEMS = max_items
+
+        self.assertEqual(0, len(self.transactions))
+        self.assertEqual([new], persister.batch_saved)
+        self.assertEqual([(changed, None)], persister.saved)
+
+    def test_workflow(self):
+        """The youth is loaded once while submitting an application"""
+        youth_factory = RecordingYouthFactory()
+        controller = YouthApplication.Controller(
+            FakeUserFactory().load_by_uuid('usr-ben'),
+            FakeYouthApplicationFactory(),
+            FakeUnitFactory(),
+            youth_factory,
+        )
+        app = FakeYouthApplicationFactory().load_by_uuid('yap-TEST-1')
+        app.youth_uuid = 'yth-TEST-1'
+        with UnitOfWork.UnitOfWork():
+            app = controller.submit_application(app)
+        self.assertEqual(Youth.APPLICATION_STATUS_UNIT_APPROVAL, app.status)
+        self.assertEqual(1, youth_factory.persister.reads)
+
+
+if __name__ == '__main__':
+    unittest.main()
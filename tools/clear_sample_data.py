@@ -2,6 +2,7 @@
 
 # pylint: disable=no-member
 """clears sample data to prime the pump"""
+from __future__ import print_function
 
 from . import AdultApplications
 from . import CharterApplications
@@ -9,6 +10,7 @@ from . import District
 from . import Guardian
 from . import SponsoringOrganization
 from . import Subdistrict
+from . import Throttle
 from . import Unit
 from . import User
 from . import Volunteer
@@ -16,15 +18,20 @@ from . import Youth
 from . import YouthApplications
 from . import sample_data
 
+# Leave the rest of each table's capacity for interactive requests
+CAPACITY_PERCENT = 50
+
 
 def clear_objects(module, source_data):
     """Clear the objects from persistence"""
     factory = module.Factory()
     persister = module.Persister()
+    Throttle.limit_table(persister._get_table_name(), CAPACITY_PERCENT)  # pylint: disable=protected-access
 
-    for data in source_data:
-        obj = factory.construct(data)
-        persister.delete(obj)
+    objs = [factory.construct(data) for data in source_data]
+    result = persister.delete_many(objs)
+    for obj, error in result['failed']:
+        print('Unable to delete {}: {}'.format(obj.uuid, error))
 
 
 def main():